@@ -1,12 +1,20 @@
-import tkinter as tk
-from src.gui import Application
+import sys
 
 if __name__ == "__main__":
+    # Any command-line arguments select a headless mode (see src/cli.py)
+    if len(sys.argv) > 1:
+        from src.cli import main
+        sys.exit(main())
+
+    # Imported only for the GUI, so headless modes also run on servers without Tk
+    import tkinter as tk
+    from src.gui import Application
+
     # Create the root window
     root = tk.Tk()
-    
+
     # Instantiate the Application class
     app = Application(master=root)
-    
+
     # Start the main loop
-    app.mainloop()
\ No newline at end of file
+    app.mainloop()
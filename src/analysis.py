@@ -0,0 +1,202 @@
+import os
+import numpy as np
+from PIL import Image
+
+ANALYSIS_SIZE = 256      # Longest side of the downsampled copy that statistics are computed on
+GRAY_TOLERANCE = 8       # Max channel spread of any pixel for an image to count as grayscale
+EDGE_THRESHOLD = 32      # Luma step between neighbours that counts as an edge
+
+# Approximate JPEG bytes per pixel at each quality for an average photo (complexity 1.0)
+JPEG_BPP_BY_QUALITY = {
+    100: 1.60, 95: 0.75, 90: 0.50, 85: 0.40, 80: 0.32, 75: 0.28, 70: 0.25, 60: 0.21,
+    50: 0.18, 40: 0.15, 30: 0.12, 20: 0.09, 10: 0.05,
+}
+MIN_PLANNED_QUALITY = 40 # Quality aimed for when an image has to be downscaled
+CHROMA_444_COST = 1.25   # Size of a 4:4:4 JPEG relative to the 4:2:0 sizes above
+MIN_444_QUALITY = 75     # Below this, luma detail matters more than full-resolution color
+
+# Pillow's JPEG 'subsampling' values
+SUBSAMPLING_444 = 0      # Full-resolution color: sharp colored lines and text
+SUBSAMPLING_420 = 2      # Color at half resolution each way: smaller, invisible on photos
+SOURCE_JPEG_QUALITY = 90 # Assumed quality of JPEG sources whose quantization tables can't be read
+
+# IJG (libjpeg) base luminance quantization table; quality q scales it by 5000/q or 200-2q percent
+IJG_LUMA_TABLE_SUM = sum([
+    16, 11, 10, 16, 24, 40, 51, 61, 12, 12, 14, 19, 26, 58, 60, 55,
+    14, 13, 16, 24, 40, 57, 69, 56, 14, 17, 22, 29, 51, 87, 80, 62,
+    18, 22, 37, 56, 68, 109, 103, 77, 24, 35, 55, 64, 81, 104, 113, 92,
+    49, 64, 78, 87, 103, 121, 120, 101, 72, 92, 95, 98, 112, 100, 103, 99,
+])
+MAX_CACHED_STATS = 10000 # Entries an AnalysisCache keeps after prune()
+
+
+class ImageStats:
+    """Cheap content statistics of one image."""
+
+    __slots__ = ('width', 'height', 'is_grayscale', 'entropy', 'edge_density', 'bilevel_ratio',
+                 'source_quality')
+
+    def __init__(self, width, height, is_grayscale, entropy, edge_density, bilevel_ratio,
+                 source_quality=None):
+        self.width = width
+        self.height = height
+        self.is_grayscale = is_grayscale      # No meaningful color
+        self.entropy = entropy                # Luma histogram entropy in bits (0-8)
+        self.edge_density = edge_density      # Fraction of pixels on a strong edge
+        self.bilevel_ratio = bilevel_ratio    # Fraction of near-black or near-white pixels
+        self.source_quality = source_quality  # Estimated quality of a JPEG source, else None
+
+    @property
+    def kind(self):
+        """'document' (black and white text), 'graphic' (few tones) or 'photo'."""
+        if self.bilevel_ratio >= 0.9:
+            return 'document'
+        if self.entropy < 5.0:
+            return 'graphic'
+        return 'photo'
+
+
+class EncodingPlan:
+    """How to encode one image: color mode, chroma subsampling and first JPEG quality to try."""
+
+    __slots__ = ('mode', 'start_quality', 'subsampling')
+
+    def __init__(self, mode, start_quality=90, subsampling=SUBSAMPLING_420):
+        self.mode = mode
+        self.start_quality = start_quality
+        self.subsampling = subsampling
+
+
+def jpeg_bpp(quality):
+    """JPEG_BPP_BY_QUALITY, linearly interpolated for qualities between its entries."""
+    qualities = sorted(JPEG_BPP_BY_QUALITY)
+    quality = min(max(quality, qualities[0]), qualities[-1])
+    for low, high in zip(qualities, qualities[1:]):
+        if quality <= high:
+            t = (quality - low) / (high - low)
+            return JPEG_BPP_BY_QUALITY[low] + t * (JPEG_BPP_BY_QUALITY[high] - JPEG_BPP_BY_QUALITY[low])
+    return JPEG_BPP_BY_QUALITY[qualities[-1]]
+
+
+def jpeg_source_quality(img):
+    """Estimates the quality a JPEG was saved at from its luminance quantization table (None if unknown)."""
+    tables = getattr(img, 'quantization', None)
+    if not tables or 0 not in tables:
+        return None
+    # Order-independent: the table sum scales like the IJG percentage
+    scale = 100.0 * sum(tables[0]) / IJG_LUMA_TABLE_SUM
+    quality = (200 - scale) / 2 if scale <= 100 else 5000 / scale
+    return min(100, max(1, round(quality)))
+
+
+def analyze_image(path):
+    """Computes ImageStats on a downsampled copy of the image."""
+    with Image.open(path) as img:
+        width, height = img.size
+        source_quality = jpeg_source_quality(img)
+        # For JPEG, draft() decodes at 1/2..1/8 scale directly from the DCT, skipping most of the work
+        img.draft('RGB', (ANALYSIS_SIZE, ANALYSIS_SIZE))
+        small = img.convert('RGB')
+    small.thumbnail((ANALYSIS_SIZE, ANALYSIS_SIZE), Image.Resampling.BILINEAR)
+
+    rgb = np.asarray(small, dtype=np.int16)
+    spread = rgb.max(axis=2) - rgb.min(axis=2)
+    # Strict: a small colored stamp or signature must not be thrown away
+    is_grayscale = bool(spread.max() <= GRAY_TOLERANCE)
+
+    luma = (rgb.astype(np.int32) @ np.array([299, 587, 114])) // 1000
+
+    hist = np.bincount(luma.ravel(), minlength=256).astype(np.float64)
+    p = hist[hist > 0] / hist.sum()
+    entropy = float(-(p * np.log2(p)).sum())
+
+    gx = np.abs(np.diff(luma, axis=1))[:-1, :]
+    gy = np.abs(np.diff(luma, axis=0))[:, :-1]
+    edge_density = float(((gx + gy) > EDGE_THRESHOLD).mean()) if gx.size else 0.0
+
+    bilevel_ratio = float(((luma < 48) | (luma > 208)).mean())
+
+    return ImageStats(width, height, is_grayscale, entropy, edge_density, bilevel_ratio, source_quality)
+
+
+def _complexity(stats, source_jpeg_bytes=None):
+    """
+    Relative JPEG cost of this content compared to an average photo. A JPEG source's own
+    size (at its estimated quality) is the best evidence; otherwise it is guessed from edge density.
+    """
+    pixels = stats.width * stats.height
+    if source_jpeg_bytes and pixels:
+        return (source_jpeg_bytes / pixels) / jpeg_bpp(stats.source_quality or SOURCE_JPEG_QUALITY)
+
+    complexity = min(2.0, max(0.3, 0.5 + stats.edge_density * 5))
+    if stats.is_grayscale:
+        complexity *= 0.6 # One channel instead of luma + two chroma
+    return complexity
+
+
+def plan_encoding(stats, target_bytes=None, source_jpeg_bytes=None):
+    """
+    Chooses the color mode, chroma subsampling and starting JPEG quality for an image.
+    Graphics (flat colors: charts, logos, screenshots) keep full-resolution color if the
+    target leaves room for it, since halving it smears colored lines and text. Photos
+    don't show the difference, and in black-and-white documents luma detail matters more.
+    Without a target size the quality is not planned. 'source_jpeg_bytes' (the size of a JPEG
+    input) calibrates the size estimate. Estimates never shrink the image; only a
+    measured full-resolution miss does (see FileProcessor._compress_file).
+    """
+    mode = 'L' if stats.is_grayscale else 'RGB'
+    keep_chroma = mode == 'RGB' and stats.kind == 'graphic'
+    if not target_bytes:
+        return EncodingPlan(mode, subsampling=SUBSAMPLING_444 if keep_chroma else SUBSAMPLING_420)
+
+    pixels = stats.width * stats.height
+    cost = _complexity(stats, source_jpeg_bytes) * pixels
+    if cost <= 0:
+        return EncodingPlan(mode)
+
+    if keep_chroma:
+        quality = _fitting_quality(cost * CHROMA_444_COST, target_bytes)
+        if quality >= MIN_444_QUALITY:
+            return EncodingPlan(mode, quality, SUBSAMPLING_444)
+    return EncodingPlan(mode, _fitting_quality(cost, target_bytes))
+
+
+def _fitting_quality(cost, target_bytes):
+    """
+    Highest quality whose estimated size fits the target; the lowest one if none does,
+    so the first trial encode measures whether downscaling is needed at all.
+    """
+    for quality in sorted(JPEG_BPP_BY_QUALITY, reverse=True):
+        if JPEG_BPP_BY_QUALITY[quality] * cost <= target_bytes:
+            return quality
+    return min(JPEG_BPP_BY_QUALITY)
+
+
+class AnalysisCache:
+    """Remembers ImageStats per file, invalidated when size or mtime change."""
+
+    def __init__(self):
+        self._entries = {} # path -> (size, mtime_ns, stats)
+
+    def get(self, path):
+        """Returns cached or freshly computed stats, or None if the file can't be analyzed."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+
+        cached = self._entries.get(path)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+
+        try:
+            stats = analyze_image(path)
+        except Exception:
+            stats = None
+        self._entries[path] = (st.st_size, st.st_mtime_ns, stats)
+        return stats
+
+    def prune(self, max_entries=MAX_CACHED_STATS):
+        """Forgets the oldest entries beyond 'max_entries' (for long-running modes)."""
+        for path in list(self._entries)[:max(0, len(self._entries) - max_entries)]:
+            del self._entries[path]
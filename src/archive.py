@@ -0,0 +1,125 @@
+import io
+import os
+import time
+import tarfile
+import zipfile
+import hashlib
+import threading
+
+ARCHIVE_KINDS = ('zip', 'tar')
+ARCHIVE_COMPRESSIONS = ('auto', 'store', 'deflate')
+
+# Already-compressed formats: deflating them again costs CPU and saves ~nothing
+STORED_EXTS = {'jpg', 'jpeg', 'png', 'webp', 'pdf', 'zip'}
+
+WRITE_BUFFER = 1024 * 1024
+
+
+class _SequentialFile:
+    """
+    Append-only file wrapper without seek()/tell(). zipfile then writes data
+    descriptors instead of seeking back to patch headers, so the whole archive
+    is one sequential, buffered write.
+    """
+
+    def __init__(self, path):
+        self._f = open(path, 'wb', buffering=WRITE_BUFFER)
+
+    def write(self, data):
+        return self._f.write(data)
+
+    def flush(self):
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
+
+
+class ArchiveWriter:
+    """
+    Collects outputs as entries of a single .zip or .tar instead of separate files.
+
+    Encoders hand over in-memory bytes (add_bytes), so nothing is written to disk
+    except the archive itself. 'compression' picks the per-entry method for zip:
+    'auto' stores JPEG/PNG/WebP/PDF and deflates the rest, 'store' and 'deflate'
+    force one method. Tar entries are uncompressed; identical entries become tar
+    hardlinks so repeated bytes are stored once.
+    """
+
+    def __init__(self, path, kind='zip', compression='auto'):
+        if kind not in ARCHIVE_KINDS:
+            raise ValueError(f"Unknown archive type '{kind}'. Choose from: {', '.join(ARCHIVE_KINDS)}")
+        if compression not in ARCHIVE_COMPRESSIONS:
+            raise ValueError(f"Unknown compression '{compression}'. Choose from: {', '.join(ARCHIVE_COMPRESSIONS)}")
+        self.path = path
+        self.kind = kind
+        self.compression = compression
+        self.entries = 0
+        self.bytes_in = 0
+
+        self._names = set()
+        self._digests = {} # content digest -> first arcname (tar hardlinks)
+        self._lock = threading.Lock() # Bulk mode adds entries from several threads
+        self._file = _SequentialFile(path)
+        if kind == 'zip':
+            self._archive = zipfile.ZipFile(self._file, 'w')
+        else:
+            self._archive = tarfile.open(fileobj=self._file, mode='w|', format=tarfile.PAX_FORMAT)
+
+    def __contains__(self, arcname):
+        return arcname in self._names
+
+    def _zip_method(self, arcname):
+        if self.compression == 'store':
+            return zipfile.ZIP_STORED
+        if self.compression == 'deflate':
+            return zipfile.ZIP_DEFLATED
+        ext = os.path.splitext(arcname)[-1].lower().strip('.')
+        return zipfile.ZIP_STORED if ext in STORED_EXTS else zipfile.ZIP_DEFLATED
+
+    def add_bytes(self, arcname, data, mtime=None):
+        """Writes one entry from memory."""
+        with self._lock:
+            self._add_bytes(arcname, data, time.time() if mtime is None else mtime)
+
+    def _add_bytes(self, arcname, data, mtime):
+        self._names.add(arcname)
+        self.entries += 1
+        self.bytes_in += len(data)
+
+        if self.kind == 'zip':
+            info = zipfile.ZipInfo(arcname, date_time=time.localtime(mtime)[:6])
+            info.compress_type = self._zip_method(arcname)
+            info.external_attr = 0o644 << 16
+            self._archive.writestr(info, data)
+            return
+
+        info = tarfile.TarInfo(arcname)
+        info.mtime = int(mtime)
+        info.mode = 0o644
+        digest = hashlib.sha256(data).digest()
+        first = self._digests.get(digest)
+        if first is not None:
+            info.type = tarfile.LNKTYPE
+            info.linkname = first
+            self._archive.addfile(info)
+            return
+
+        self._digests[digest] = arcname
+        info.size = len(data)
+        self._archive.addfile(info, io.BytesIO(data))
+
+    def add_file(self, arcname, path):
+        """Writes one entry from an existing file (e.g. the copied original)."""
+        with open(path, 'rb') as f:
+            data = f.read()
+        self.add_bytes(arcname, data, mtime=os.path.getmtime(path))
+
+    def close(self):
+        self._archive.close()
+        self._file.close()
+
+    def summary(self):
+        size = os.path.getsize(self.path)
+        return (f"Archive written: {self.path} ({self.entries} entries, "
+                f"{round(self.bytes_in / 1024 / 1024, 2)} MB in, {round(size / 1024 / 1024, 2)} MB on disk)")
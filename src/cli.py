@@ -0,0 +1,150 @@
+import argparse
+import os
+import sys
+from .config import OPTION_CODES
+from .fileprocessor import FileProcessor
+from .events import JsonlSink
+from .archive import ARCHIVE_KINDS, ARCHIVE_COMPRESSIONS
+
+
+class ConsoleLogger:
+    """Stands in for the GUI when running headless: log messages go to stdout."""
+
+    def log_message(self, message):
+        print(message, flush=True)
+
+
+def _parse_options(codes):
+    """Turns short codes ('A1', 'b4') into the full option names used by FileProcessor."""
+    selected = []
+    for code in codes:
+        option = OPTION_CODES.get(code.upper())
+        if option is None:
+            raise argparse.ArgumentTypeError(
+                f"Unknown option '{code}'. Choose from: {', '.join(OPTION_CODES)}")
+        selected.append(option)
+    return selected
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="myDocs",
+        description="Run myDocs without the GUI. With no arguments, the GUI starts.")
+    parser.add_argument("-o", "--options", nargs="+", default=["A1"], metavar="CODE",
+                        help="Processing options by code, e.g. A1 B4 (default: A1)")
+    parser.add_argument("--separate-folders", action="store_true",
+                        help="Put outputs into one subfolder per extension")
+    parser.add_argument("--output", metavar="DIR",
+                        help="Output directory (default: myDocs/ next to the app)")
+    parser.add_argument("--pdf-max-pixels", type=int, metavar="PX",
+                        help="Render PDF pages at a DPI that makes the longest side at most PX pixels")
+    parser.add_argument("--pdf-page-kb", type=int, metavar="KB",
+                        help="Render PDF pages at a DPI that makes each page's JPEG roughly KB kilobytes")
+    parser.add_argument("--events", metavar="FILE",
+                        help="Also append every processing event as a JSON line to FILE")
+
+    bulk = parser.add_argument_group("bulk folder mode")
+    bulk.add_argument("--folder", nargs="?", const=".", metavar="DIR",
+                      help="Process every supported file in DIR once (default: current folder) "
+                           "and write outputs to DIR/myDocs unless --output is given")
+    bulk.add_argument("--jobs", type=int, metavar="N",
+                      help="Files processed in parallel (default: CPU count, at most 8)")
+    bulk.add_argument("--archive", choices=ARCHIVE_KINDS,
+                      help="Write all outputs into one new archive instead of separate files")
+    bulk.add_argument("--archive-compression", choices=ARCHIVE_COMPRESSIONS, default="auto",
+                      help="Per-entry zip compression: 'auto' stores already compressed formats "
+                           "(JPEG/PNG/WebP/PDF) and deflates the rest (default: auto)")
+
+    watch = parser.add_argument_group("watch-folder mode")
+    watch.add_argument("--watch", nargs="+", metavar="DIR",
+                       help="Keep running and process files dropped into these folders")
+    watch.add_argument("--settle", type=float, default=2.0, metavar="SECONDS",
+                       help="How long a file must stop changing before it is processed (default: 2)")
+    watch.add_argument("--poll-interval", type=float, default=2.0, metavar="SECONDS",
+                       help="Scan interval when polling (default: 2)")
+    watch.add_argument("--polling", action="store_true",
+                       help="Use polling even where inotify is available")
+
+    server = parser.add_argument_group("HTTP server mode")
+    server.add_argument("--serve", metavar="[HOST:]PORT",
+                        help="Serve POST /convert on this address (default host: 127.0.0.1)")
+    server.add_argument("--workers", type=int, metavar="N",
+                        help="Worker processes for encoding (default: CPU count)")
+    server.add_argument("--max-jobs", type=int, metavar="N",
+                        help="Uploads accepted at once; others wait (default: --workers)")
+    return parser
+
+
+def run_serve(args):
+    from .server import serve
+
+    host, _, port = args.serve.rpartition(":")
+    try:
+        port = int(port)
+    except ValueError:
+        print(f"ERROR: Bad port in --serve {args.serve}", file=sys.stderr)
+        return 2
+
+    serve(host or "127.0.0.1", port, max_jobs=args.max_jobs, workers=args.workers,
+          pdf_max_pixels=args.pdf_max_pixels, log=ConsoleLogger().log_message)
+    return 0
+
+
+def run_folder(args, selected_options):
+    folder = os.path.abspath(args.folder)
+    if not os.path.isdir(folder):
+        print(f"ERROR: Not a folder: {folder}", file=sys.stderr)
+        return 2
+
+    processor = FileProcessor(ConsoleLogger(), output_dir=args.output or os.path.join(folder, 'myDocs'))
+    if args.events:
+        processor.add_sink(JsonlSink(args.events))
+    processor.pdf_max_pixels = args.pdf_max_pixels
+    processor.pdf_target_bytes = args.pdf_page_kb * 1024 if args.pdf_page_kb else None
+    processor.run_folder(folder, selected_options, args.separate_folders, workers=args.jobs,
+                         archive=args.archive, archive_compression=args.archive_compression)
+    return 0
+
+
+def run_watch(args, selected_options):
+    from .watcher import FolderWatcher
+
+    for folder in args.watch:
+        if not os.path.isdir(folder):
+            print(f"ERROR: Not a folder: {folder}", file=sys.stderr)
+            return 2
+
+    processor = FileProcessor(ConsoleLogger(), output_dir=args.output)
+    if args.events:
+        processor.add_sink(JsonlSink(args.events))
+    processor.pdf_max_pixels = args.pdf_max_pixels
+    processor.pdf_target_bytes = args.pdf_page_kb * 1024 if args.pdf_page_kb else None
+    watcher = FolderWatcher(processor, args.watch, selected_options, args.separate_folders,
+                            settle=args.settle, poll_interval=args.poll_interval,
+                            use_inotify=not args.polling)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        watcher.stop()
+        print("Stopped watching.")
+    return 0
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    try:
+        selected_options = _parse_options(args.options)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    if args.folder:
+        return run_folder(args, selected_options)
+    if args.watch:
+        return run_watch(args, selected_options)
+    if args.serve:
+        return run_serve(args)
+
+    parser.error("Nothing to do: pass --folder [DIR], --watch DIR or --serve PORT "
+                 "(run without arguments for the GUI).")
@@ -16,4 +16,10 @@ PROCESS_OPTIONS_B = [
     "B3: Compress to < 500 KB",
     "B4: Compress to < 1 MB",
     "B5: Compress to < 5 MB"
-]
\ No newline at end of file
+]
+
+# Short codes ("A1", "B4", ...) for headless modes (folder watcher, command line)
+OPTION_CODES = {option.split(':')[0]: option for option in PROCESS_OPTIONS_A + PROCESS_OPTIONS_B}
+
+# Extensions picked up when scanning folders
+SUPPORTED_EXTS = ['jpg', 'jpeg', 'png', 'webp', 'bmp', 'tiff', 'pdf']
@@ -0,0 +1,251 @@
+import os
+import json
+import time
+import threading
+from collections import Counter, defaultdict
+
+COPY_ORIGINAL_OP = 'copy_original' # Op name of the copy of the source file into the output folder
+
+# Text of each OpResult reason, filled with its args by sinks that show text.
+# '{parts}' stands for the sub-results (PDF pages), joined with ', '.
+RESULT_TEXT = {
+    'exists': "Skipped. Target file already exists: {}",
+    'converted': "Converted to {} at {}",
+    'convert_failed': "Failed to convert to {}: {}",
+    'converted_pdf': "Converted image to PDF at {}",
+    'pdf_failed': "Failed to convert image to PDF: {}",
+    'poppler_failed': "PDF conversion failed (Is Poppler installed?): {}",
+    'pdf_pages': "PDF to {} finished. Details: {parts}",
+    'page_exists': "Page {} skipped (exists).",
+    'page_converted': "Page {} converted to {}.",
+    'page_failed': "Page {} failed conversion: {}",
+    'pdf_target_unsupported': "Skipped: PDF cannot be converted to {}.",
+    'unsupported_source': "Skipped: Unsupported source extension '{}'.",
+    'unsupported_conversion': "Skipped: Unsupported extension '{}' for conversion.",
+    'original_exists': "Skipped: Original file copy already exists in {}",
+    'original_archived': "Added original file to archive",
+    'original_copied': "Copied original file to {}",
+    'original_failed': "Failed to copy original file: {}",
+    'compress_jpeg_only': "Skipped: Compression logic only implemented for JPG/JPEG.",
+    'compressed_exists': "Skipped. Target compressed file already exists: {}",
+    'compressed': "Successfully compressed to {} at Q={} ({} KB) in {} trial encodes",
+    'compressed_resized': "Successfully compressed to {} at Q={} ({} KB), resized to {}x{} in {} trial encodes",
+    'compress_missed': "Failed to compress to {}. Smallest size achieved was {} KB.",
+    'compress_failed': "Compression failed: {}",
+    'size_unreadable': "Error reading file size for compression: {}",
+    'under_target': "Skipped: File ({} KB) is already under the target size of {}.",
+    'size_under_target': "Skipped {}: File is already under the target size.",
+    'op_error': "Failed: {}",
+}
+
+# --- EVENT RECORDS ---
+
+
+class Event:
+    """
+    Base of all processor events: small slotted records holding raw values only.
+    Turning them into text is up to the sink that displays them.
+    Fields can be passed positionally (in __slots__ order) or by name; missing ones are None.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, *args, **kwargs):
+        values = dict(zip(self.__slots__, args))
+        values.update(kwargs)
+        for name in self.__slots__:
+            setattr(self, name, values.get(name))
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class RunStarted(Event):
+    __slots__ = ('file_count',)
+
+
+class RunFinished(Event):
+    __slots__ = ('file_count', 'duration')
+
+
+class FileStarted(Event):
+    __slots__ = ('path', 'output_dir', 'separate_folders')
+
+
+class FileFinished(Event):
+    __slots__ = ('path', 'outputs', 'duration')
+
+
+class FileSkipped(Event):
+    """Whole file skipped; 'duplicate_of' is set when outputs were reused from an identical input."""
+    __slots__ = ('path', 'reason', 'duplicate_of', 'reused')
+
+
+class FileFailed(Event):
+    __slots__ = ('path', 'error')
+
+
+class OpResult(Event):
+    """
+    What a processing method did: status ('ok' | 'skipped' | 'failed'), a reason code from
+    RESULT_TEXT and its args. Methods that run several steps return their 'parts' instead.
+    """
+    __slots__ = ('status', 'reason', 'args', 'parts')
+
+    @classmethod
+    def combine(cls, parts, reason=None, args=()):
+        """One result for several steps: failed if any step failed, else ok if any step wrote something."""
+        statuses = {part.status for part in parts}
+        status = next((s for s in ('failed', 'ok') if s in statuses), 'skipped')
+        return cls(status, reason, args, list(parts))
+
+    def as_dict(self):
+        record = super().as_dict()
+        record['parts'] = [part.as_dict() for part in self.parts or []]
+        return record
+
+
+def describe(result):
+    """Renders an OpResult (and its parts) as log text."""
+    if not result.reason:
+        return "\n    ".join(describe(part) for part in result.parts or [])
+    parts = ", ".join(describe(part) for part in result.parts or [])
+    return RESULT_TEXT[result.reason].format(*(result.args or ()), parts=parts)
+
+
+class OpFinished(Event):
+    """One processing option (or the original copy) finished on a file; 'result' is its OpResult."""
+    __slots__ = ('path', 'op', 'status', 'result', 'bytes_written', 'duration')
+
+
+class OutputWritten(Event):
+    __slots__ = ('path', 'output_path', 'nbytes', 'deduplicated')
+
+
+class Message(Event):
+    """Free-form note. 'template' is only formatted with 'args' by sinks that show text."""
+    __slots__ = ('template', 'args', 'level', 'path')
+
+    def text(self):
+        return self.template.format(*self.args) if self.args else self.template
+
+
+# --- SINKS ---
+
+
+class GuiSink:
+    """Renders events as log lines for anything with log_message(text): the GUI or a console."""
+
+    def __init__(self, gui):
+        self.gui = gui
+
+    def handle(self, event):
+        line = self._format(event)
+        if line is not None:
+            self.gui.log_message(line)
+
+    def _format(self, event):
+        if isinstance(event, OpFinished):
+            if event.op == COPY_ORIGINAL_OP:
+                return f"    - {describe(event.result)}"
+            return f"    - {event.op}: {describe(event.result)}"
+        if isinstance(event, FileStarted):
+            if event.separate_folders:
+                mode = f"Separate Folders based on extension Created in: {event.output_dir}/"
+            else:
+                mode = f"Standard Output Folder: {os.path.basename(event.output_dir)}/"
+            return f"--> Processing file: {os.path.basename(event.path)}\n    {mode}"
+        if isinstance(event, FileSkipped):
+            if event.duplicate_of:
+                return (f"    - Duplicate of {os.path.basename(event.duplicate_of)}: "
+                        f"reused {event.reused} outputs without re-encoding")
+            return f"--> Skipped {os.path.basename(event.path)}: {event.reason}"
+        if isinstance(event, FileFailed):
+            return f"    - ERROR: {os.path.basename(event.path)}: {event.error}"
+        if isinstance(event, Message):
+            prefix = {'error': "ERROR: ", 'warning': "WARNING: "}.get(event.level, "")
+            indent = "    " if event.path else ""
+            return f"{indent}{prefix}{event.text()}"
+        if isinstance(event, RunStarted):
+            return f"Starting process on {event.file_count} files..."
+        if isinstance(event, RunFinished):
+            return "\n--- ALL PROCESSING COMPLETE ---"
+        return None # OutputWritten / FileFinished carry nothing new for a reader
+
+
+class JsonlSink:
+    """Appends one JSON object per event to a file, for other tools to consume."""
+
+    def __init__(self, path):
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def handle(self, event):
+        record = {'event': type(event).__name__, 'ts': round(time.time(), 3)}
+        record.update(event.as_dict())
+        if isinstance(event, Message):
+            record['text'] = event.text()
+            del record['args']
+        if isinstance(event, OpFinished):
+            record['result'] = event.result.as_dict()
+            record['text'] = describe(event.result)
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class CollectorSink:
+    """Keeps every event in memory (for tests and embedding)."""
+
+    def __init__(self):
+        self.events = []
+
+    def handle(self, event):
+        self.events.append(event)
+
+    def of_type(self, event_type):
+        return [event for event in self.events if isinstance(event, event_type)]
+
+
+class MetricsSink:
+    """Aggregates counts, bytes and time per operation without keeping the events."""
+
+    def __init__(self):
+        self.files = Counter()                # started / finished / skipped / failed
+        self.ops = Counter()                  # (op, status) -> count
+        self.op_seconds = defaultdict(float)  # op -> total duration
+        self.outputs = 0
+        self.bytes_written = 0
+        self.deduplicated = 0
+
+    def handle(self, event):
+        if isinstance(event, OpFinished):
+            self.ops[(event.op, event.status)] += 1
+            self.op_seconds[event.op] += event.duration or 0.0
+        elif isinstance(event, OutputWritten):
+            self.outputs += 1
+            self.bytes_written += event.nbytes or 0
+            self.deduplicated += 1 if event.deduplicated else 0
+        elif isinstance(event, FileStarted):
+            self.files['started'] += 1
+        elif isinstance(event, FileFinished):
+            self.files['finished'] += 1
+        elif isinstance(event, FileSkipped):
+            self.files['skipped'] += 1
+        elif isinstance(event, FileFailed):
+            self.files['failed'] += 1
+
+    def summary(self):
+        slowest = sorted(self.op_seconds.items(), key=lambda item: item[1], reverse=True)
+        timing = ", ".join(f"{op} {seconds:.2f}s" for op, seconds in slowest)
+        return (f"{self.files['finished']} files, {self.outputs} outputs "
+                f"({round(self.bytes_written / 1024 / 1024, 2)} MB, {self.deduplicated} deduplicated), "
+                f"{self.files['skipped']} skipped, {self.files['failed']} failed. Time per op: {timing}")
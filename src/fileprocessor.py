@@ -1,16 +1,71 @@
+import io
 import os
+import re
 import sys
+import math
+import time
 import shutil
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from PIL import Image
-from pdf2image import convert_from_path # Requires Poppler installation
+from pdf2image import convert_from_path, pdfinfo_from_path # Requires Poppler installation
+from .config import SUPPORTED_EXTS
+from .outputstore import OutputStore
+from .state import ProcessedIndex
+from .archive import ArchiveWriter
+from .analysis import (AnalysisCache, EncodingPlan, plan_encoding, jpeg_bpp, MIN_PLANNED_QUALITY,
+                       SUBSAMPLING_420)
+from .events import (GuiSink, Message, RunStarted, RunFinished, FileStarted, FileFinished, FileSkipped,
+                     FileFailed, OpFinished, OpResult, OutputWritten, COPY_ORIGINAL_OP)
+
+# --- PDF RASTERIZATION ---
+PDF_POINTS_PER_INCH = 72
+DEFAULT_PDF_DPI = 200          # pdf2image's default; never rendered above this
+MIN_PDF_DPI = 36
+JPEG_BYTES_PER_PIXEL = 0.3     # Rough size of a Q=90 JPEG, used to turn a byte budget into pixels
+
+JPEG_QUALITY_STEPS = list(range(10, 96, 5)) # Qualities tried when compressing to a target size
+SEARCH_TOLERANCE = 0.15        # An encode that fits within 15% of the target is accepted right away
+
+
+def _per_thread(name, factory):
+    """Attribute kept per thread, so bulk mode workers each track their own current file."""
+    def get(self):
+        try:
+            return getattr(self._local, name)
+        except AttributeError:
+            value = factory()
+            setattr(self._local, name, value)
+            return value
+
+    def set(self, value):
+        setattr(self._local, name, value)
+
+    return property(get, set)
+
 
 class FileProcessor:
-    def __init__(self, gui_app):
-        self.gui = gui_app
+    # State of the file being processed (per thread, see run_folder)
+    _current_input_key = _per_thread('input_key', lambda: None) # Input this thread claimed (OutputStore.claim_input)
+    _current_outputs = _per_thread('outputs', list)             # Output paths written for the file being processed
+    _current_complete = _per_thread('complete', lambda: True)   # False once a target was left to another file
+    _current_failed = _per_thread('failed', lambda: False)      # True once an op of the current file failed
+    _current_file = _per_thread('file', lambda: None)           # Source file being processed (for OutputWritten events)
+    _op_bytes = _per_thread('op_bytes', int)                    # Bytes written by the running op
+
+    def __init__(self, gui_app=None, output_dir=None, sinks=None):
+        # Progress is reported as events (see events.py); the GUI is just one of the sinks
+        self.sinks = list(sinks or [])
+        if gui_app is not None:
+            self.sinks.insert(0, GuiSink(gui_app))
+        self._emit_lock = threading.Lock() # Workers of a parallel run share the sinks
+        self._local = threading.local()
         
         # --- NEW: Set up the base output directory when the processor initializes ---
         self.APP_ROOT = self._get_app_root_dir()
-        self.OUTPUT_BASE_DIR = os.path.join(self.APP_ROOT, 'myDocs')
+        # 'output_dir' lets headless modes (e.g. the folder watcher) write somewhere other than 'myDocs'
+        self.OUTPUT_BASE_DIR = os.path.abspath(output_dir) if output_dir else os.path.join(self.APP_ROOT, 'myDocs')
         os.makedirs(self.OUTPUT_BASE_DIR, exist_ok=True) # Create 'myDocs' if it doesn't exist
         
         self.TARGET_SIZES = {
@@ -36,12 +91,96 @@ class FileProcessor:
             "B4: Compress to < 1 MB": lambda fp, od, sf: self._compress_to_size_entry(fp, od, sf, "1 MB"),
             "B5: Compress to < 5 MB": lambda fp, od, sf: self._compress_to_size_entry(fp, od, sf, "5 MB"),
         }
+        # Short option code ('A1', 'B4', ...) reported as the op name of each method
+        self.op_names = {method: option.split(':')[0] for option, method in self.processing_map.items()}
         # List of all supported image extensions
         self.IMAGE_EXTS = ['jpg', 'jpeg', 'png', 'webp', 'bmp', 'tiff']
+
+        # Hashes finished outputs so identical bytes are stored once (hardlinked)
+        self.output_store = OutputStore()
+        self.copy_originals = True     # Headless callers that only want results can turn this off
+        self.archive = None            # ArchiveWriter while running in archive output mode
+
+        # PDF pages are rendered just large enough for these (None = pdf2image's default DPI)
+        self.pdf_max_pixels = None     # Longest side of a rendered page, in pixels
+        self.pdf_target_bytes = None   # Rough JPEG size of a rendered page, in bytes
+
+        # Content statistics per image, used to plan color mode / quality / downscaling
+        self.analysis_cache = AnalysisCache()
     def _get_app_root_dir(self):
         """Finds the directory where the main application script (main.py) is located."""
         # Cleaned up method, relies only on sys.argv[0]
         return os.path.dirname(os.path.abspath(sys.argv[0]))
+
+    # --- EVENTS ---
+
+    def add_sink(self, sink):
+        """Registers another event consumer (anything with handle(event))."""
+        self.sinks.append(sink)
+
+    def emit(self, event):
+        with self._emit_lock:
+            for sink in self.sinks:
+                sink.handle(event)
+
+    def _output_written(self, output_path, nbytes, deduplicated=False):
+        self._op_bytes += nbytes
+        self.emit(OutputWritten(self._current_file, output_path, nbytes, deduplicated))
+
+    # --- OUTPUT BOOKKEEPING ---
+
+    def _output_exists(self, output_path):
+        """
+        Checks for an existing target. It may hold another file's bytes (e.g. 'scan.png' written
+        by 'scan.jpg'), so it is not an output of the current input, and the current input can
+        no longer be reused as a whole.
+        """
+        if self.archive is not None:
+            exists = self._arcname(output_path) in self.archive
+        else:
+            exists = os.path.exists(output_path)
+        if exists:
+            self._current_complete = False
+        return exists
+
+    def _finalize_output(self, output_path):
+        """Registers a freshly written output with the dedup store."""
+        self._current_outputs.append(output_path)
+        return self.output_store.register(output_path)
+
+    def _ensure_dir(self, dir_path):
+        """Creates an output subfolder (not needed when writing into an archive)."""
+        if self.archive is None:
+            os.makedirs(dir_path, exist_ok=True)
+
+    def _arcname(self, output_path):
+        return os.path.relpath(output_path, self.OUTPUT_BASE_DIR).replace(os.sep, '/')
+
+    def _output_label(self, output_path):
+        """Where an output ended up, for results: its path, or 'archive.zip:entry' in archive mode."""
+        if self.archive is not None:
+            return f"{os.path.basename(self.archive.path)}:{self._arcname(output_path)}"
+        return output_path
+
+    def _encode(self, img, pillow_format, **params):
+        """Encodes an image into memory and returns the bytes."""
+        buffer = io.BytesIO()
+        img.save(buffer, pillow_format, **params)
+        return buffer.getvalue()
+
+    def _write_output(self, output_path, data):
+        """Writes encoded bytes to their output path, or into the archive in archive mode."""
+        if self.archive is not None:
+            self.archive.add_bytes(self._arcname(output_path), data)
+            self._current_outputs.append(output_path)
+            self._output_written(output_path, len(data))
+            return
+
+        with open(output_path, 'wb') as f:
+            f.write(data)
+        deduplicated = self._finalize_output(output_path)
+        self._output_written(output_path, len(data), deduplicated)
+
     # --- CORE CONVERSION FUNCTIONS ---
 
     def _img_to_img(self, input_path, base_output_dir, target_format, separate_folders):
@@ -51,80 +190,142 @@ class FileProcessor:
         # New Logic: If Separate Folders is ON, create an extension subfolder
         if separate_folders:
             final_dest_dir = os.path.join(base_output_dir, target_format.lower())
-            os.makedirs(final_dest_dir, exist_ok=True)
+            self._ensure_dir(final_dest_dir)
         else:
             final_dest_dir = base_output_dir
 
         output_path = os.path.join(final_dest_dir, f"{base_name}.{target_format.lower()}")
-        if os.path.exists(output_path):
-            return f"Skipped. Target file already exists: {os.path.basename(output_path)}"
+        if self._output_exists(output_path):
+            return OpResult('skipped', 'exists', (os.path.basename(output_path),))
 
         try:
             img = Image.open(input_path).convert("RGB") # Use RGB for safety
             # Pillow uses 'jpeg' for both .jpg and .jpeg, and 'webp' for .webp
             pillow_format = 'jpeg' if target_format in ('jpg', 'jpeg') else target_format
             
-            img.save(output_path, pillow_format)
-            return f"Converted to {target_format.upper()} at {output_path}"
+            self._write_output(output_path, self._encode(img, pillow_format))
+            return OpResult('ok', 'converted', (target_format.upper(), self._output_label(output_path)))
         except Exception as e:
-            return f"Failed to convert to {target_format.upper()}: {e}"
+            return OpResult('failed', 'convert_failed', (target_format.upper(), e))
 
     def _img_to_pdf(self, input_path, base_output_dir, separate_folders):
         base_name = os.path.splitext(os.path.basename(input_path))[0]
         
         if separate_folders:
             final_dest_dir = os.path.join(base_output_dir, 'pdf') # Target is 'pdf'
-            os.makedirs(final_dest_dir, exist_ok=True)
+            self._ensure_dir(final_dest_dir)
         else:
             final_dest_dir = base_output_dir
 
         output_path = os.path.join(final_dest_dir, f"{base_name}.pdf")
 
-        if os.path.exists(output_path):
-            return f"Skipped. Target file already exists: {os.path.basename(output_path)}"
+        if self._output_exists(output_path):
+            return OpResult('skipped', 'exists', (os.path.basename(output_path),))
 
         try:
             img = Image.open(input_path)
             # Ensure proper conversion for PDF saving
             pdf = img.convert("RGB") 
-            pdf.save(output_path, save_all=True) # save_all=True is useful for multi-page TIFFs
-            return f"Converted image to PDF at {output_path}"
+            # save_all=True is useful for multi-page TIFFs
+            self._write_output(output_path, self._encode(pdf, 'pdf', save_all=True))
+            return OpResult('ok', 'converted_pdf', (self._output_label(output_path),))
         except Exception as e:
-            return f"Failed to convert image to PDF: {e}"
+            return OpResult('failed', 'pdf_failed', (e,))
+
+    def _pdf_to_img(self, input_path, base_output_dir, target_format='jpeg', separate_folders=False,
+                    max_pixels=None, target_bytes=None):
+        """
+        Renders every page of a PDF to an image file.
+        'max_pixels' (longest side) or 'target_bytes' cap the render DPI per page,
+        defaulting to the processor's pdf_max_pixels / pdf_target_bytes.
+        """
+        base_name = os.path.splitext(os.path.basename(input_path))[0]
+        max_pixels = self.pdf_max_pixels if max_pixels is None else max_pixels
+        target_bytes = self.pdf_target_bytes if target_bytes is None else target_bytes
 
-    def _pdf_to_img(self, input_path, base_output_dir, target_format='jpeg', separate_folders=False): # <-- ADDED ARG
-        # ...
-        
         # New Logic: If Separate Folders is ON, create an extension subfolder
         if separate_folders:
             final_dest_dir = os.path.join(base_output_dir, target_format.lower()) # Target is 'jpeg', 'png', etc.
-            os.makedirs(final_dest_dir, exist_ok=True)
+            self._ensure_dir(final_dest_dir)
         else:
             final_dest_dir = base_output_dir
             
         try:
             # Use 'poppler_path' argument if poppler is not in your system PATH
-            pdfs = convert_from_path(input_path)
+            page_runs = self._pdf_render_plan(input_path, max_pixels, target_bytes)
+            if page_runs is None:
+                pdfs = convert_from_path(input_path)
+            else:
+                # Each run of pages sharing a DPI is rendered once, at that DPI
+                pdfs = []
+                for first_page, last_page, dpi in page_runs:
+                    pdfs.extend(convert_from_path(input_path, dpi=dpi, first_page=first_page, last_page=last_page))
         except Exception as e:
-            return f"PDF conversion failed (Is Poppler installed?): {e}"
+            return OpResult('failed', 'poppler_failed', (e,))
 
         results = []
         for i, pdf in enumerate(pdfs):
             # Output file name includes page number for multi-page PDFs
-            output_name = f"{base_output_dir}_page_{i+1}.{target_format.lower()}"
-            output_path = os.path.join(base_output_dir, output_name)
+            output_name = f"{base_name}_page_{i+1}.{target_format.lower()}"
+            output_path = os.path.join(final_dest_dir, output_name)
             
             try:
-                if os.path.exists(output_path):
-                    results.append(f"Page {i+1} skipped (exists).")
+                if self._output_exists(output_path):
+                    results.append(OpResult('skipped', 'page_exists', (i+1,)))
                     continue
                 
-                pdf.save(output_path, target_format)
-                results.append(f"Page {i+1} converted to {target_format.upper()}.")
+                self._write_output(output_path, self._encode(pdf, target_format))
+                results.append(OpResult('ok', 'page_converted', (i+1, target_format.upper())))
             except Exception as e:
-                results.append(f"Page {i+1} failed conversion: {e}")
+                results.append(OpResult('failed', 'page_failed', (i+1, e)))
                 
-        return f"PDF to {target_format.upper()} finished. Details: {', '.join(results)}"
+        return OpResult.combine(results, 'pdf_pages', (target_format.upper(),))
+
+    def _pdf_render_plan(self, input_path, max_pixels, target_bytes):
+        """
+        Picks the render DPI of every page from its MediaBox (via pdfinfo) before rasterizing.
+        Returns [(first_page, last_page, dpi), ...] with consecutive equal-DPI pages merged,
+        or None when there is no target (render everything at the default DPI).
+        """
+        if not max_pixels and not target_bytes:
+            return None
+
+        # pdfinfo clamps the last page to the page count, so one call lists every page size
+        info = pdfinfo_from_path(input_path, first_page=1, last_page=10 ** 6)
+        page_sizes = {}
+        for key, value in info.items():
+            page = re.match(r"Page\s+(\d+) size", key)
+            size = re.match(r"([\d.]+) x ([\d.]+)", str(value))
+            if page and size:
+                page_sizes[int(page.group(1))] = (float(size.group(1)), float(size.group(2)))
+
+        page_count = int(info.get("Pages", 0) or len(page_sizes))
+        if not page_count:
+            return None
+
+        runs = []
+        for page in range(1, page_count + 1):
+            width_pt, height_pt = page_sizes.get(page, page_sizes.get(1, (0, 0)))
+            dpi = self._dpi_for_page(width_pt, height_pt, max_pixels, target_bytes)
+            if runs and runs[-1][2] == dpi and runs[-1][1] == page - 1:
+                runs[-1] = (runs[-1][0], page, dpi)
+            else:
+                runs.append((page, page, dpi))
+        return runs
+
+    def _dpi_for_page(self, width_pt, height_pt, max_pixels, target_bytes):
+        """Lowest of the DPIs implied by each target, clamped to [MIN_PDF_DPI, DEFAULT_PDF_DPI]."""
+        if width_pt <= 0 or height_pt <= 0:
+            return DEFAULT_PDF_DPI
+
+        dpi = DEFAULT_PDF_DPI
+        if max_pixels:
+            dpi = min(dpi, max_pixels * PDF_POINTS_PER_INCH / max(width_pt, height_pt))
+        if target_bytes:
+            # width_px * height_px = pixel budget, and px = pt * dpi / 72
+            pixel_budget = target_bytes / JPEG_BYTES_PER_PIXEL
+            dpi = min(dpi, PDF_POINTS_PER_INCH * math.sqrt(pixel_budget / (width_pt * height_pt)))
+        return int(max(MIN_PDF_DPI, dpi))
 
 
     # In logic/fileprocessor.py (add these new methods)
@@ -144,13 +345,13 @@ class FileProcessor:
         elif extension == 'pdf':
             # PDFs can only be converted to images (or PDF-to-PDF which is usually a copy, ignored here)
             if target_format in self.IMAGE_EXTS:
-                results.append(self._pdf_to_img(file_path, output_dir, target_format))
+                results.append(self._pdf_to_img(file_path, output_dir, target_format, separate_folders))
             else:
-                return f"Skipped: PDF cannot be converted to {target_format.upper()}."
+                return OpResult('skipped', 'pdf_target_unsupported', (target_format.upper(),))
         else:
-            return f"Skipped: Unsupported source extension '{extension}'."
+            return OpResult('skipped', 'unsupported_source', (extension,))
             
-        return "\n    ".join(results)
+        return OpResult.combine(results)
 
     # These methods map directly to the checkboxes:
     def _single_target_to_pdf(self, file_path, output_dir, separate_folders):
@@ -183,9 +384,9 @@ class FileProcessor:
         if extension in self.IMAGE_EXTS:
             return self._image_conversion_suite(file_path, output_dir, extension, separate_folders)
         elif extension == 'pdf':
-            return self._pdf_conversion_suite(file_path, output_dir)
+            return self._pdf_conversion_suite(file_path, output_dir, separate_folders)
         else:
-            return f"Skipped: Unsupported extension '{extension}' for conversion."
+            return OpResult('skipped', 'unsupported_conversion', (extension,))
     # --- DEDICATED SUITES ---
     def _image_conversion_suite(self, file_path, output_dir, current_ext, separate_folders):
         """Manages all required conversions for an image file."""
@@ -199,16 +400,16 @@ class FileProcessor:
         # Convert to PDF
         results.append(self._img_to_pdf(file_path, output_dir, separate_folders))
         
-        return "\n    ".join(results)
+        return OpResult.combine(results)
 
-    def _pdf_conversion_suite(self, file_path, output_dir):
+    def _pdf_conversion_suite(self, file_path, output_dir, separate_folders=False):
         """Manages all required conversions for a PDF file."""
         results = []
         
         # PDF to image conversion
-        results.append(self._pdf_to_img(file_path, output_dir, target_format='jpeg' ))
+        results.append(self._pdf_to_img(file_path, output_dir, target_format='jpeg', separate_folders=separate_folders))
         
-        return "\n    ".join(results)
+        return OpResult.combine(results)
     
     # In logic/fileprocessor.py
 
@@ -222,7 +423,7 @@ class FileProcessor:
             # When separate_folders is True, the output_dir passed in is myDocs/FILE_NAME_NO_EXT/
             # We append the extension subfolder (e.g., myDocs/FILE_NAME_NO_EXT/png/)
             final_dest_dir = os.path.join(base_output_dir, extension)
-            os.makedirs(final_dest_dir, exist_ok=True)
+            self._ensure_dir(final_dest_dir)
         else:
             # When separate_folders is False, the output_dir passed in is myDocs/EXTENSION/
             final_dest_dir = base_output_dir
@@ -233,14 +434,22 @@ class FileProcessor:
         
         # 3. Check for existence and copy (The new part!)
         try:
-            if os.path.exists(final_dest_path):
-                return f"Skipped: Original file copy already exists in {os.path.basename(final_dest_dir)}"
+            if self._output_exists(final_dest_path):
+                return OpResult('skipped', 'original_exists', (os.path.basename(final_dest_dir),))
             
+            if self.archive is not None:
+                self.archive.add_file(self._arcname(final_dest_path), file_path)
+                self._current_outputs.append(final_dest_path)
+                self._output_written(final_dest_path, os.path.getsize(file_path))
+                return OpResult('ok', 'original_archived')
+
             shutil.copy2(file_path, final_dest_path) # Copy to the final path
-            return f"Copied original file to {os.path.basename(final_dest_dir)}"
+            deduplicated = self._finalize_output(final_dest_path)
+            self._output_written(final_dest_path, os.path.getsize(final_dest_path), deduplicated)
+            return OpResult('ok', 'original_copied', (os.path.basename(final_dest_dir),))
             
         except Exception as e:
-            return f"Failed to copy original file: {e}"
+            return OpResult('failed', 'original_failed', (e,))
         
     # In logic/fileprocessor.py (add these new methods)
 
@@ -248,49 +457,104 @@ class FileProcessor:
     
     def _compress_file(self, file_path, output_dir, size_key, separate_folders):
         """
-        Attempts to compress an image to a target file size using iterative quality reduction.
+        Attempts to compress an image to a target file size.
+        The analysis pre-pass plans the color mode, chroma subsampling and the first quality to try; a search guided
+        by the measured sizes then needs only a few trial encodes. The image is only downscaled
+        when even the lowest quality at full resolution was measured to be too big.
         Currently focuses on JPEG as it supports compression quality.
         """
         extension = os.path.splitext(file_path)[-1].lower().strip('.')
         target_bytes = self.TARGET_SIZES[size_key]
         
         if extension not in ('jpg', 'jpeg'):
-            return f"Skipped: Compression logic only implemented for JPG/JPEG."
+            return OpResult('skipped', 'compress_jpeg_only')
         
         # 1. Determine Output Path (Reusing the subfolder logic)
         base_name = os.path.splitext(os.path.basename(file_path))[0]
         
         if separate_folders:
             final_dest_dir = os.path.join(output_dir, 'compressed') # Use a generic 'compressed' subfolder
-            os.makedirs(final_dest_dir, exist_ok=True)
+            self._ensure_dir(final_dest_dir)
         else:
             final_dest_dir = output_dir
 
         output_path = os.path.join(final_dest_dir, f"{base_name}_comp_{size_key.replace(' ', '')}.jpg")
         
-        if os.path.exists(output_path):
-            return f"Skipped. Target compressed file already exists: {os.path.basename(output_path)}"
+        if self._output_exists(output_path):
+            return OpResult('skipped', 'compressed_exists', (os.path.basename(output_path),))
 
-        # 2. Iterative Compression
+        # 2. Planned Compression
         try:
-            img = Image.open(file_path).convert('RGB')
-            quality = 90
-            
-            while quality >= 10:
-                img.save(output_path, 'jpeg', quality=quality)
-                current_size = os.path.getsize(output_path)
-                
-                if current_size <= target_bytes:
-                    return f"Successfully compressed to {size_key} at Q={quality} ({round(current_size / 1024)} KB)"
-                
-                quality -= 10 # Drop quality and try again
-                
-            # If the loop finishes without success
-            os.remove(output_path) # Clean up the largest failed attempt
-            return f"Failed to compress to {size_key}. Smallest size achieved was {round(current_size / 1024)} KB."
+            stats = self.analysis_cache.get(file_path)
+            source_bytes = os.path.getsize(file_path)
+            plan = plan_encoding(stats, target_bytes, source_bytes) if stats is not None else EncodingPlan('RGB')
+
+            original = img = Image.open(file_path).convert(plan.mode)
+            quality, data, trials = self._search_quality(img, target_bytes, plan.start_quality, plan.subsampling)
+
+            if quality is None:
+                # Even the lowest quality is too big (data is that encode): shrink using its measured size
+                estimated = len(data) * jpeg_bpp(MIN_PLANNED_QUALITY) / jpeg_bpp(JPEG_QUALITY_STEPS[0])
+                img = self._scaled(original, (target_bytes / estimated) ** 0.5)
+                quality, data, retries = self._search_quality(img, target_bytes, MIN_PLANNED_QUALITY, plan.subsampling)
+                trials += retries
+
+            current_kb = round(len(data) / 1024)
+            if quality is None:
+                return OpResult('failed', 'compress_missed', (size_key, current_kb))
+
+            # Trial encodes stay in memory; only the accepted result is written
+            self._write_output(output_path, data)
+            if img.size != original.size:
+                return OpResult('ok', 'compressed_resized', (size_key, quality, current_kb, img.width, img.height, trials))
+            return OpResult('ok', 'compressed', (size_key, quality, current_kb, trials))
 
         except Exception as e:
-            return f"Compression failed: {e}"
+            return OpResult('failed', 'compress_failed', (e,))
+
+    def _scaled(self, img, scale):
+        """Returns the image resized by 'scale' (no-op at 1.0 or above)."""
+        if scale >= 1.0:
+            return img
+        size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+        return img.resize(size, Image.Resampling.LANCZOS)
+
+    def _search_quality(self, img, target_bytes, start_quality, subsampling=SUBSAMPLING_420):
+        """
+        Finds a high JPEG quality in JPEG_QUALITY_STEPS whose output fits 'target_bytes'.
+        Probes the planned quality first. Each measured size then predicts the next quality
+        (sizes scale roughly like jpeg_bpp), kept inside the bracket of known results and
+        bisecting if predictions keep missing. Stops as soon as an encode fits within
+        SEARCH_TOLERANCE of the target. Returns (quality, data, trials); quality is None if
+        nothing fits, in which case data is the smallest attempt (the lowest quality).
+        """
+        steps = JPEG_QUALITY_STEPS
+        fits, too_big = -1, len(steps) # Indices known to fit / known to be too big
+        i = min(range(len(steps)), key=lambda k: abs(steps[k] - start_quality))
+        best = smallest = None
+        trials = 0
+        aim = target_bytes * (1 - SEARCH_TOLERANCE / 2) # Middle of the accepted band
+
+        while too_big - fits > 1:
+            data = self._encode(img, 'jpeg', quality=steps[i], subsampling=subsampling)
+            trials += 1
+            if len(data) <= target_bytes:
+                fits, best = i, data
+                if len(data) >= target_bytes * (1 - SEARCH_TOLERANCE):
+                    break # Close enough; a higher step would most likely not fit
+            else:
+                too_big, smallest = i, data
+
+            if trials >= 3 and fits >= 0 and too_big < len(steps):
+                i = (fits + too_big) // 2
+            else:
+                budget = jpeg_bpp(steps[i]) * aim / len(data)
+                predicted = max((k for k, q in enumerate(steps) if jpeg_bpp(q) <= budget), default=0)
+                i = min(max(predicted, fits + 1), too_big - 1)
+
+        if best is None:
+            return None, smallest, trials
+        return steps[fits], best, trials
 
     # --- ENTRY POINTS (Called by processing_map) ---# In logic/fileprocessor.py
 
@@ -305,12 +569,11 @@ class FileProcessor:
         try:
             original_size = os.path.getsize(file_path)
         except OSError as e:
-            return f"Error reading file size for compression: {e}"
+            return OpResult('failed', 'size_unreadable', (e,))
 
         # 2. Optimization Check
         if original_size <= target_bytes:
-            original_kb = round(original_size / 1024, 2)
-            return f"Skipped: File ({original_kb} KB) is already under the target size of {size_key}."
+            return OpResult('skipped', 'under_target', (round(original_size / 1024, 2), size_key))
 
         # 3. If file is larger, proceed to compression
         return self._compress_file(file_path, output_dir, size_key, separate_folders)
@@ -328,7 +591,7 @@ class FileProcessor:
         try:
             original_size = os.path.getsize(file_path)
         except OSError as e:
-            return f"Error reading file size for compression: {e}"
+            return OpResult('failed', 'size_unreadable', (e,))
 
         # Get size keys and sort them from largest to smallest (e.g., '5 MB', '1 MB', '500 KB', '250 KB')
         # This allows us to skip all larger targets once we find a match.
@@ -336,7 +599,7 @@ class FileProcessor:
                                 key=lambda k: self.TARGET_SIZES[k], 
                                 reverse=True)
                                 
-        self.gui.log_message(f"    Original size: {round(original_size / 1024 / 1024, 2)} MB")
+        self.emit(Message("Original size: {:.2f} MB", (original_size / 1024 / 1024,), path=file_path))
 
         for size_key in size_keys_sorted:
             target_bytes = self.TARGET_SIZES[size_key]
@@ -345,59 +608,293 @@ class FileProcessor:
             if original_size <= target_bytes:
                 # If the original file size is ALREADY under the target size,
                 # we skip this target and just log that it's already met.
-                results.append(f"Skipped {size_key}: File is already under the target size.")
+                results.append(OpResult('skipped', 'size_under_target', (size_key,)))
                 continue # Move to the next (smaller) compression target
             
             # If the original file is larger than the target, we proceed with compression.
             results.append(self._compress_file(file_path, output_dir, size_key, separate_folders))
                 
-        return "\n    ".join(results)
+        return OpResult.combine(results)
         
     # --- run_all and process_single_file will need updates next ---
     # (The following code replaces the run_all and process_single_file from before)
 
-    def run_all(self, file_paths, selected_options, separate_folders):
+    def run_all(self, file_paths, selected_options, separate_folders, archive=None, archive_compression='auto'):
         # ... (Same as before, checks for files/options)
         if not file_paths:
-            self.gui.log_message("ERROR: No files selected. Processing aborted.")
+            self.emit(Message("No files selected. Processing aborted.", level='error'))
             return
 
         if not selected_options:
-            self.gui.log_message("WARNING: No processing options selected. Nothing to do.")
+            self.emit(Message("No processing options selected. Nothing to do.", level='warning'))
             return
             
-        self.gui.log_message(f"Starting process on {len(file_paths)} files...")
+        started = time.perf_counter()
+        self.emit(RunStarted(len(file_paths)))
+
+        methods_to_run = self.methods_for(selected_options)
+        self._analyze_batch(file_paths, selected_options)
 
-        methods_to_run = [self.processing_map[opt] for opt in selected_options if opt in self.processing_map]
+        # Archive mode: every output becomes an entry of one .zip/.tar instead of a separate file
+        if archive:
+            self._open_archive(archive, archive_compression)
         
-        for file_path in file_paths:
-            self.process_single_file(file_path, methods_to_run, separate_folders)
+        try:
+            for file_path in file_paths:
+                self.process_single_file(file_path, methods_to_run, separate_folders)
+        finally:
+            archive_writer = self._close_archive()
             
-        self.gui.log_message("\n--- ALL PROCESSING COMPLETE ---")
+        self.emit(RunFinished(len(file_paths), time.perf_counter() - started))
+        self._report_space(archive_writer)
+
+    def _open_archive(self, kind, compression='auto'):
+        """Starts archive output mode with a new, uniquely named archive in the output folder."""
+        stem = os.path.join(self.OUTPUT_BASE_DIR, f"myDocs_{time.strftime('%Y%m%d_%H%M%S')}")
+        archive_path, n = f"{stem}.{kind}", 1
+        while os.path.exists(archive_path): # Several runs within the same second
+            n += 1
+            archive_path = f"{stem}_{n}.{kind}"
+        self.archive = ArchiveWriter(archive_path, kind=kind, compression=compression)
+        self.emit(Message("Writing all outputs into {}", (os.path.basename(archive_path),)))
+
+    def _close_archive(self):
+        """Ends archive output mode, even after an error. Returns the closed writer (or None)."""
+        archive_writer, self.archive = self.archive, None
+        if archive_writer is not None:
+            archive_writer.close()
+        return archive_writer
+
+    def _report_space(self, archive_writer=None):
+        if archive_writer is not None:
+            self.emit(Message(archive_writer.summary()))
+        else:
+            self.emit(Message(self.output_store.space_report()))
+
+
+    def _analyze_batch(self, file_paths, selected_options):
+        """
+        Pre-pass: computes content statistics up front (in parallel threads; decoding and
+        NumPy release the GIL) so each encode can be planned. Only B options plan encodes,
+        and only for JPEG inputs (see _compress_file), so other runs skip it. Results are cached.
+        """
+        if not any(option.startswith('B') for option in selected_options):
+            return
+        image_paths = [path for path in file_paths
+                       if os.path.splitext(path)[-1].lower().strip('.') in ('jpg', 'jpeg')]
+        if not image_paths:
+            return
 
+        with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as pool:
+            all_stats = [stats for stats in pool.map(self.analysis_cache.get, image_paths) if stats is not None]
+
+        kinds = Counter(stats.kind for stats in all_stats)
+        grayscale = sum(1 for stats in all_stats if stats.is_grayscale)
+        summary = ", ".join(f"{count} {kind}" for kind, count in kinds.most_common())
+        self.emit(Message("Analyzed {} images: {} ({} grayscale)", (len(all_stats), summary, grayscale)))
+
+    # --- BULK FOLDER MODE ---
+
+    def scan_folder(self, folder):
+        """Returns the supported files directly inside 'folder' (not recursive), sorted by name."""
+        file_paths = []
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                # Hidden files and editor/download temp files ('~$doc') are never inputs
+                if entry.name.startswith(('.', '~')) or not entry.is_file():
+                    continue
+                if os.path.splitext(entry.name)[-1].lower().strip('.') in SUPPORTED_EXTS:
+                    file_paths.append(entry.path)
+        return sorted(file_paths)
+
+    def run_folder(self, folder, selected_options, separate_folders, workers=None,
+                   archive=None, archive_compression='auto'):
+        """
+        Bulk mode: runs the selected options on every supported file in 'folder', several
+        files at a time. Files unchanged since the last run with the same options are
+        skipped (tracked in a ProcessedIndex in the output folder). With 'archive'
+        ('zip' / 'tar') every file goes into one new archive instead, so nothing is skipped.
+        Returns the number of files processed.
+        """
+        if not selected_options:
+            self.emit(Message("No processing options selected. Nothing to do.", level='warning'))
+            return 0
+
+        options_key = self.options_key(selected_options, separate_folders)
+        index = ProcessedIndex(self.OUTPUT_BASE_DIR)
+        file_paths = []
+        for file_path in self.scan_folder(folder):
+            if archive or index.needs_processing(file_path, options_key):
+                file_paths.append(file_path)
+            else:
+                self.emit(FileSkipped(file_path, "unchanged since last run"))
+
+        if not file_paths:
+            self.emit(Message("Nothing new to process in {}", (folder,)))
+            index.save()
+            return 0
+
+        started = time.perf_counter()
+        self.emit(RunStarted(len(file_paths)))
+        methods_to_run = self.methods_for(selected_options)
+        self._analyze_batch(file_paths, selected_options)
+
+        # Files sharing a name ('scan.jpg', 'scan.png') write the same outputs, so they run in one worker
+        groups = defaultdict(list)
+        for file_path in file_paths:
+            # Outputs of the previous version would otherwise be skipped as 'already exists'
+            for old_output in ([] if archive else index.previous_outputs(file_path)):
+                try:
+                    os.remove(old_output)
+                except OSError:
+                    pass
+            groups[os.path.splitext(os.path.basename(file_path))[0].lower()].append(file_path)
+
+        if archive:
+            self._open_archive(archive, archive_compression)
+
+        workers = workers or min(8, os.cpu_count() or 1)
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(self._process_group, group, methods_to_run, separate_folders)
+                           for group in groups.values()]
+                for future in as_completed(futures):
+                    for file_path, outputs, ok in future.result():
+                        # Archive entries aren't files in the output folder, so they aren't tracked
+                        if archive:
+                            continue
+                        if ok:
+                            index.mark_done(file_path, options_key, outputs)
+                        else:
+                            index.mark_failed(file_path, outputs) # Retried on the next run
+        finally:
+            archive_writer = self._close_archive()
+        index.save()
+
+        self.emit(RunFinished(len(file_paths), time.perf_counter() - started))
+        self._report_space(archive_writer)
+        return len(file_paths)
+
+    def _process_group(self, file_paths, methods_to_run, separate_folders):
+        """Processes files one after another in the current worker thread. Returns (path, outputs, ok) triples."""
+        done = []
+        for file_path in file_paths:
+            try:
+                outputs, ok = self.process_single_file(file_path, methods_to_run, separate_folders)
+            except Exception as e:
+                self.emit(FileFailed(file_path, f"Processing failed: {e}"))
+                continue
+            done.append((file_path, outputs, ok))
+        return done
+
+    def options_key(self, selected_options, separate_folders):
+        """Identifies an option set for ProcessedIndex; any change must invalidate earlier results."""
+        key = "|".join(sorted(selected_options)) + ("|separate" if separate_folders else "")
+        if self.pdf_max_pixels:
+            key += f"|pdf{self.pdf_max_pixels}px"
+        if self.pdf_target_bytes:
+            key += f"|pdf{self.pdf_target_bytes}b"
+        return key
+
+    def methods_for(self, selected_options):
+        """Maps selected option names to their processing methods."""
+        return [self.processing_map[opt] for opt in selected_options if opt in self.processing_map]
 
     def process_single_file(self, file_path, methods_to_run, separate_folders):
-        self.gui.log_message(f"--> Processing file: {os.path.basename(file_path)}")
-        
+        """
+        Runs the given methods on one file. Returns (output paths belonging to it, ok);
+        ok is False if any op failed, so the file must not be recorded as done.
+        """
         # 1. DETERMINE OUTPUT DIRECTORY (Implements Point 3 Logic)
-        extension = os.path.splitext(file_path)[-1].lower().strip('.')
-        output_dir = self.OUTPUT_BASE_DIR # Base is always 'myDocs'
-        
-        # Standard Mode (If 'separate_folders' is NOT checked)
-        if not separate_folders:
-            self.gui.log_message(f"    Standard Output Folder: {os.path.basename(output_dir)}/")
-        
-        # Separate Folder Mode (If 'separate_folders' IS checked)
-        else:
-            self.gui.log_message(f"    Separate Folders based on extension Created in: {output_dir}/")
-
-        self.gui.log_message(f"    Outputting to: {os.path.relpath(output_dir, self.APP_ROOT)}")
+        # Base is always 'myDocs'; with 'separate_folders' each method adds an extension subfolder
+        output_dir = self.OUTPUT_BASE_DIR
+        started = time.perf_counter()
+        self.emit(FileStarted(file_path, output_dir, separate_folders))
+
+        # Same options on identical bytes give identical outputs, so duplicates can reuse them
+        variant = (tuple(repr(m) for m in methods_to_run), separate_folders)
+
+        # Waits while an identical file is still being processed in another thread
+        input_key, duplicate = self.output_store.claim_input(file_path, variant)
+        self._current_outputs = []
+        self._current_file = file_path
+        self._current_failed = False
+        # Hardlink reuse only applies to files on disk, not archive entries
+        if duplicate is not None and self.archive is None and self._reuse_duplicate_outputs(file_path, duplicate):
+            self._current_file = None
+            self.emit(FileFinished(file_path, list(self._current_outputs), time.perf_counter() - started))
+            return self._current_outputs, not self._current_failed
+
+        # Only the claimant publishes; a duplicate that couldn't reuse just processes normally
+        self._current_input_key = input_key if duplicate is None else None
+        self._current_complete = True
+        try:
+            # 2. Run all selected processing methods
+            for method in methods_to_run:
+                op = self.op_names.get(method, getattr(method, '__name__', repr(method)))
+                self._run_op(op, method, file_path, output_dir, separate_folders)
+
+            # 3. Move the original file (Implements Point 2)
+            if self.copy_originals:
+                self._run_op(COPY_ORIGINAL_OP, self._copy_original_file, file_path, output_dir, separate_folders)
+        finally:
+            # Failed ops leave gaps too, so only a clean run is offered to duplicates
+            complete = self._current_complete and self.archive is None
+            self.output_store.finish_input(self._current_input_key, file_path, self._current_outputs, complete)
+            self._current_input_key = None
+            self._current_file = None
+
+        self.emit(FileFinished(file_path, list(self._current_outputs), time.perf_counter() - started))
+        return self._current_outputs, not self._current_failed
+
+    def _run_op(self, op, method, file_path, output_dir, separate_folders):
+        """Runs one processing method and reports it as an OpFinished event."""
+        self._op_bytes = 0
+        started = time.perf_counter()
+        try:
+            result = method(file_path, output_dir, separate_folders)
+        except Exception as e:
+            result = OpResult('failed', 'op_error', (e,))
 
-        # 2. Run all selected processing methods
-        for method in methods_to_run:
-            status = method(file_path, output_dir, separate_folders)
-            self.gui.log_message(f"    - {method.__name__}: {status}")
+        if result.status == 'failed':
+            self._current_complete = False
+            self._current_failed = True
+        self.emit(OpFinished(file_path, op, result.status, result, self._op_bytes, time.perf_counter() - started))
 
-        # 3. Move the original file (Implements Point 2)
-        copy_status = self._copy_original_file(file_path, output_dir, separate_folders)
-        self.gui.log_message(f"    - {copy_status}")
\ No newline at end of file
+    def _reuse_duplicate_outputs(self, file_path, duplicate):
+        """
+        Hardlinks the outputs of an identical, already processed input under this
+        file's name instead of encoding everything again.
+        Returns False (so the file is processed normally) if the outputs can't be mapped.
+        """
+        source_path, source_outputs = duplicate
+        source_base = os.path.splitext(os.path.basename(source_path))[0]
+        new_base = os.path.splitext(os.path.basename(file_path))[0]
+
+        # Every output name must start with the source's base name to be renamed safely
+        targets = []
+        for output_path in source_outputs:
+            output_name = os.path.basename(output_path)
+            if not output_name.startswith(source_base) or not os.path.exists(output_path):
+                return False
+            new_name = new_base + output_name[len(source_base):]
+            targets.append((output_path, os.path.join(os.path.dirname(output_path), new_name)))
+
+        if not targets:
+            return False
+
+        linked = 0
+        for output_path, new_path in targets:
+            if os.path.exists(new_path):
+                continue # Another file's output; never claim it as ours
+            try:
+                self.output_store.link_output(output_path, new_path)
+                self._current_outputs.append(new_path)
+                self._output_written(new_path, os.path.getsize(new_path), deduplicated=True)
+                linked += 1
+            except OSError as e:
+                self._current_failed = True
+                self.emit(FileFailed(file_path, f"Failed to reuse {os.path.basename(output_path)}: {e}"))
+
+        self.emit(FileSkipped(file_path, "duplicate", source_path, linked))
+        return True
\ No newline at end of file
@@ -4,8 +4,11 @@ from tkinter import filedialog
 from PIL import Image, ImageTk # <-- ADDED
 from pdf2image import convert_from_path
 from .fileprocessor import FileProcessor
+from .archive import ARCHIVE_KINDS, ARCHIVE_COMPRESSIONS
 from .config import PROCESS_OPTIONS_A, PROCESS_OPTIONS_B
 
+NO_ARCHIVE = "separate files" # Archive menu entry for the normal output mode
+
 # --- 1. Checkbox Group Frame (Updated) ---
 
 class CheckboxGroup(tk.LabelFrame):
@@ -92,6 +95,9 @@ class Application(tk.Frame):
         
         # --- Control Variables ---
         self.separate_folders_var = tk.BooleanVar(value=False) 
+        # Archive output mode: one .zip/.tar instead of many files
+        self.archive_kind_var = tk.StringVar(value=NO_ARCHIVE)
+        self.archive_compression_var = tk.StringVar(value=ARCHIVE_COMPRESSIONS[0])
         self.selected_files = []
         
         self.file_processor = FileProcessor(self) # Pass 'self' (the GUI instance) to the processor
@@ -210,13 +216,27 @@ class Application(tk.Frame):
         tk.Checkbutton(self, 
                        text="Make separate folders", 
                        variable=self.separate_folders_var).grid(
-            row=row_start, column=0, columnspan=2, padx=(10, 0), pady=(10, 15), sticky=tk.W)
+            row=row_start, column=0, columnspan=1, padx=(10, 0), pady=(10, 15), sticky=tk.W)
+
+        # Archive Output: kind (none / zip / tar) and per-entry compression
+        archive_frame = tk.Frame(self)
+        archive_frame.grid(row=row_start, column=1, columnspan=1, pady=(10, 15), sticky=tk.W)
+        tk.Label(archive_frame, text="Pack into:").pack(side=tk.LEFT)
+        tk.OptionMenu(archive_frame, self.archive_kind_var, NO_ARCHIVE, *ARCHIVE_KINDS,
+                      command=self._handle_archive_kind).pack(side=tk.LEFT)
+        self.archive_compression_menu = tk.OptionMenu(archive_frame, self.archive_compression_var, *ARCHIVE_COMPRESSIONS)
+        self.archive_compression_menu.pack(side=tk.LEFT)
+        self._handle_archive_kind(self.archive_kind_var.get())
 
         # Run Button
         tk.Button(self, text="Run Process", bg="green", fg="white", 
                   command=self.run_process).grid(
             row=row_start, column=2, pady=(10, 15), padx=10, sticky=tk.E) 
 
+    def _handle_archive_kind(self, kind):
+        """Per-entry compression only applies to zip (tar entries are never compressed)."""
+        self.archive_compression_menu.config(state=tk.NORMAL if kind == 'zip' else tk.DISABLED)
+
     # --- Logic Methods ---
 
     def get_selected_options(self):
@@ -274,6 +294,8 @@ class Application(tk.Frame):
         # ... (Get input data)
         file_paths = self.selected_files
         separate_folders = self.separate_folders_var.get()
+        archive = self.archive_kind_var.get()
+        archive = None if archive == NO_ARCHIVE else archive
         
         # NEW: Check master mode for selected options
         if self.master_mode_var.get() == "all":
@@ -291,7 +313,8 @@ class Application(tk.Frame):
         self.message_area.config(state=tk.DISABLED)
 
         # 3. Hand off the task to the processor
-        self.file_processor.run_all(file_paths, selected_options, separate_folders)    
+        self.file_processor.run_all(file_paths, selected_options, separate_folders, archive=archive,
+                                    archive_compression=self.archive_compression_var.get())    
     
     def _display_preview(self, file_path):
         """Handles loading and displaying the file preview."""
@@ -0,0 +1,215 @@
+import os
+import shutil
+import hashlib
+import threading
+
+CHUNK_SIZE = 1024 * 1024
+MAX_ENTRIES = 10000 # Per table, kept by long-running modes (see prune)
+
+
+def file_digest(path):
+    """Returns the SHA-256 hex digest of a file, read in 1 MB chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class OutputStore:
+    """
+    Content-addressed bookkeeping for everything written into 'myDocs'.
+
+    Every finished output is hashed; if the same bytes were already written
+    under another name, the new name is replaced by a hardlink to the first
+    copy so the data is stored once. Inputs are hashed too, so a file that is
+    a byte-for-byte duplicate of an earlier input (e.g. 'scan.jpg' and
+    'scan (1).jpg') can reuse the earlier outputs instead of encoding again.
+    Outputs can be deleted or rewritten later, so a remembered path is only
+    trusted while it still holds the bytes it was recorded with.
+    """
+
+    def __init__(self):
+        self._outputs_by_digest = {}  # output digest -> first path holding those bytes
+        self._inputs_by_digest = {}   # (input digest, variant) -> (source path, [(output path, digest)])
+        self._digest_cache = {}       # path -> ((inode, size, mtime_ns), digest)
+        self._in_flight = {}          # (input digest, variant) -> threading.Event set when that input finishes
+        self._lock = threading.Lock() # Bulk mode processes files in several threads
+
+        self.logical_bytes = 0   # Bytes the user sees across all output names
+        self.linked_bytes = 0    # Bytes that were hardlinked instead of stored again
+        self.linked_files = 0
+
+    # --- HASHING ---
+
+    def digest(self, path):
+        """Returns the content digest of a file, cached by inode, size and mtime."""
+        st = os.stat(path)
+        stamp = (st.st_ino, st.st_size, st.st_mtime_ns)
+        with self._lock:
+            cached = self._digest_cache.get(path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+
+        value = file_digest(path) # Hashed outside the lock
+        with self._lock:
+            self._digest_cache[path] = (stamp, value)
+        return value
+
+    def _holds(self, path, digest):
+        """True if 'path' still exists and holds the bytes with 'digest'."""
+        try:
+            return self.digest(path) == digest
+        except OSError:
+            return False
+
+    # --- INPUT SIDE ---
+
+    def claim_input(self, file_path, variant=None):
+        """
+        Looks up an earlier input with identical bytes processed with the same options
+        ('variant'). Returns (key, duplicate):
+        - duplicate is (source path, output paths) of that finished input, or
+        - duplicate is None and the caller now processes this content itself; it must
+          call finish_input(key, ...) afterwards, even if processing fails.
+        If an identical input is still being processed in another thread, this waits for
+        it, so its output list is never seen half-filled. An earlier input whose outputs
+        were since deleted or rewritten is forgotten, and this input is processed again.
+        """
+        try:
+            key = (self.digest(file_path), variant)
+        except OSError:
+            return None, None
+
+        while True:
+            with self._lock:
+                entry = self._inputs_by_digest.get(key)
+                if entry is not None and os.path.abspath(entry[0]) == os.path.abspath(file_path):
+                    entry = None # The same file again: nothing to reuse
+                pending = self._in_flight.get(key)
+                if entry is None and pending is None:
+                    self._in_flight[key] = threading.Event()
+                    return key, None
+
+            if entry is None:
+                pending.wait()
+                continue
+
+            source_path, outputs = entry
+            # Hashed outside the lock; output digests are usually still cached from register()
+            if all(self._holds(path, digest) for path, digest in outputs):
+                return key, (source_path, [path for path, _ in outputs])
+
+            with self._lock:
+                if self._inputs_by_digest.get(key) is entry:
+                    del self._inputs_by_digest[key]
+
+    def finish_input(self, input_key, file_path, output_paths, complete=True):
+        """
+        Ends a claim_input() and offers the outputs for reuse by identical inputs. Only
+        'complete' inputs qualify: if any target was skipped because another file already
+        wrote it, the outputs on disk are not all this input's bytes.
+        """
+        if input_key is None:
+            return
+        outputs = []
+        if complete and output_paths:
+            try:
+                outputs = [(path, self.digest(path)) for path in output_paths]
+            except OSError:
+                outputs = [] # An output vanished already; nothing reliable to offer
+        with self._lock:
+            if outputs:
+                self._inputs_by_digest[input_key] = (file_path, outputs) # Newest complete outputs
+            pending = self._in_flight.pop(input_key, None)
+        if pending is not None:
+            pending.set() # Waiting duplicates reuse the outputs, or process on their own if incomplete
+
+    # --- OUTPUT SIDE ---
+
+    def register(self, output_path):
+        """
+        Hashes a finished output. If identical bytes already exist under
+        another name, replaces this file with a hardlink to that copy.
+        Returns True if the file was deduplicated.
+        """
+        try:
+            size = os.path.getsize(output_path)
+            key = self.digest(output_path)
+        except OSError:
+            return False
+
+        with self._lock:
+            self.logical_bytes += size
+            existing = self._outputs_by_digest.get(key)
+
+        # The first copy may have been deleted or rewritten since it was recorded
+        if existing is None or not self._holds(existing, key):
+            with self._lock:
+                self._outputs_by_digest[key] = output_path
+            return False
+
+        if os.path.samefile(existing, output_path):
+            return False
+
+        if self._replace_with_link(existing, output_path):
+            with self._lock:
+                self.linked_bytes += size
+                self.linked_files += 1
+            return True
+        return False
+
+    def link_output(self, existing_path, new_path):
+        """
+        Creates 'new_path' as a hardlink to an already stored output
+        (falling back to a copy on filesystems without hardlinks).
+        """
+        os.makedirs(os.path.dirname(new_path), exist_ok=True)
+        try:
+            os.link(existing_path, new_path)
+        except OSError:
+            shutil.copy2(existing_path, new_path)
+            self.register(new_path)
+            return False
+
+        size = os.path.getsize(new_path)
+        with self._lock:
+            self.logical_bytes += size
+            self.linked_bytes += size
+            self.linked_files += 1
+        return True
+
+    def _replace_with_link(self, existing_path, output_path):
+        """Atomically swaps 'output_path' for a hardlink to 'existing_path'."""
+        tmp_path = output_path + '.dedup-tmp'
+        try:
+            os.link(existing_path, tmp_path)
+            os.replace(tmp_path, output_path)
+            with self._lock:
+                self._digest_cache.pop(output_path, None)
+            return True
+        except OSError:
+            # Cross-device or no hardlink support (e.g. FAT32): keep the copy.
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+    def prune(self, max_entries=MAX_ENTRIES):
+        """
+        Drops the oldest inputs, outputs and cached digests beyond 'max_entries' each, so a
+        long-running watcher doesn't grow forever. Forgotten files are simply hashed again.
+        """
+        with self._lock:
+            for table in (self._inputs_by_digest, self._outputs_by_digest, self._digest_cache):
+                for key in list(table)[:max(0, len(table) - max_entries)]:
+                    del table[key]
+
+    # --- REPORTING ---
+
+    def space_report(self):
+        """Returns a one-line summary of how much space deduplication saved."""
+        stored = self.logical_bytes - self.linked_bytes
+        return (f"Output space: {round(self.logical_bytes / 1024 / 1024, 2)} MB written, "
+                f"{round(stored / 1024 / 1024, 2)} MB stored, "
+                f"{round(self.linked_bytes / 1024 / 1024, 2)} MB deduplicated "
+                f"({self.linked_files} hardlinked files)")
@@ -0,0 +1,361 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit, parse_qs, quote
+from .config import OPTION_CODES
+from .archive import STORED_EXTS
+
+CHUNK_SIZE = 64 * 1024           # Upload/download buffer size; bounds memory per connection
+MAX_HEADER_SIZE = 64 * 1024
+DEFAULT_MAX_BODY = 200 * 1024 * 1024
+
+REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 408: "Request Timeout",
+    411: "Length Required", 413: "Payload Too Large", 422: "Unprocessable Entity",
+    431: "Request Header Fields Too Large", 500: "Internal Server Error",
+}
+
+CONTENT_TYPES = {
+    'jpg': 'image/jpeg', 'jpeg': 'image/jpeg', 'png': 'image/png', 'webp': 'image/webp',
+    'bmp': 'image/bmp', 'tiff': 'image/tiff', 'pdf': 'application/pdf', 'zip': 'application/zip',
+}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class _CollectingLogger:
+    """GUI stand-in for worker processes: keeps log lines to send back."""
+
+    def __init__(self):
+        self.lines = []
+
+    def log_message(self, message):
+        self.lines.append(message)
+
+
+def convert_job(input_path, work_dir, selected_options, separate_folders, want_zip, pdf_max_pixels=None):
+    """
+    Runs in a worker process: converts one uploaded file into 'work_dir/out'.
+    Returns (result path, log lines), or (None, log lines) if nothing was produced.
+    With several outputs (or want_zip), the result is a zip of all of them.
+    """
+    from .fileprocessor import FileProcessor
+
+    logger = _CollectingLogger()
+    processor = FileProcessor(logger, output_dir=os.path.join(work_dir, 'out'))
+    processor.copy_originals = False
+    processor.pdf_max_pixels = pdf_max_pixels
+
+    methods = processor.methods_for(selected_options)
+    outputs, _ = processor.process_single_file(input_path, methods, separate_folders)
+    outputs = [path for path in outputs if os.path.isfile(path)]
+
+    if not outputs:
+        return None, logger.lines
+    if len(outputs) == 1 and not want_zip:
+        return outputs[0], logger.lines
+
+    base_name = os.path.splitext(os.path.basename(input_path))[0]
+    zip_path = os.path.join(work_dir, f"{base_name}.zip")
+    with zipfile.ZipFile(zip_path, 'w') as zf:
+        for path in outputs:
+            ext = os.path.splitext(path)[-1].lower().strip('.')
+            compress = zipfile.ZIP_STORED if ext in STORED_EXTS else zipfile.ZIP_DEFLATED
+            zf.write(path, os.path.relpath(path, processor.OUTPUT_BASE_DIR), compress_type=compress)
+    return zip_path, logger.lines
+
+
+class ConversionServer:
+    """
+    Local HTTP/1.1 front end for FileProcessor, built on asyncio streams.
+
+        POST /convert?options=A1,B4&name=scan.jpg[&separate=1][&zip=1]
+            body: the file (Content-Length or chunked). Returns the single output,
+            or a zip when there are several outputs (or zip=1).
+        GET /options   option codes and names (JSON)
+        GET /health    'ok'
+
+    Uploads are spooled to disk in CHUNK_SIZE pieces and responses are streamed with
+    drain(), so memory per connection stays bounded. At most 'max_jobs' uploads are
+    accepted at once; further requests are not read until a slot frees up, which pushes
+    back on clients through TCP. Encoding runs in a process pool, and connections are
+    kept alive between requests until 'idle_timeout'.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8765, max_jobs=None, workers=None,
+                 max_body=DEFAULT_MAX_BODY, idle_timeout=15.0, pdf_max_pixels=None, log=print):
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.max_jobs = max_jobs or self.workers
+        self.max_body = max_body
+        self.idle_timeout = idle_timeout
+        self.pdf_max_pixels = pdf_max_pixels
+        self.log = log
+
+        self._slots = None
+        self._pool = None
+        self._server = None
+
+    # --- LIFECYCLE ---
+
+    async def start(self):
+        self._slots = asyncio.Semaphore(self.max_jobs)
+        # Spawned, not forked: a forked worker would inherit open client sockets and keep
+        # them alive after the server closes its end, so clients never see EOF
+        self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                         mp_context=multiprocessing.get_context('spawn'))
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port,
+                                                  limit=MAX_HEADER_SIZE)
+        self.port = self._server.sockets[0].getsockname()[1] # Resolves port 0
+        self.log(f"myDocs server listening on http://{self.host}:{self.port} "
+                 f"({self.workers} workers, {self.max_jobs} concurrent jobs)")
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        finally:
+            self._pool.shutdown(cancel_futures=True)
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+        self._pool.shutdown(cancel_futures=True)
+
+    # --- CONNECTION HANDLING ---
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.idle_timeout)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+                    break # Idle or client went away
+                except asyncio.LimitOverrunError:
+                    await self._send_error(writer, HttpError(431, "Headers too large"), keep_alive=False)
+                    break
+
+                try:
+                    method, target, version, headers = self._parse_head(head)
+                except HttpError as e:
+                    await self._send_error(writer, e, keep_alive=False)
+                    break
+
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+
+                try:
+                    await self._dispatch(method, target, headers, reader, writer, keep_alive)
+                except HttpError as e:
+                    # The body may be unread, so the connection can't be reused safely
+                    keep_alive = False
+                    await self._send_error(writer, e, keep_alive=False)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    def _parse_head(self, head):
+        lines = head.decode('latin-1').split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ")
+        except ValueError:
+            raise HttpError(400, "Malformed request line")
+
+        headers = {}
+        for line in lines[1:]:
+            if not line:
+                continue
+            name, sep, value = line.partition(":")
+            if not sep:
+                raise HttpError(400, "Malformed header")
+            headers[name.strip().lower()] = value.strip()
+        return method.upper(), target, version, headers
+
+    async def _dispatch(self, method, target, headers, reader, writer, keep_alive):
+        url = urlsplit(target)
+        if url.path == '/health':
+            await self._send_bytes(writer, 200, b"ok", 'text/plain', keep_alive)
+        elif url.path == '/options':
+            body = json.dumps(OPTION_CODES, indent=2).encode('utf-8')
+            await self._send_bytes(writer, 200, body, 'application/json', keep_alive)
+        elif url.path == '/convert':
+            if method != 'POST':
+                raise HttpError(405, "Use POST /convert")
+            await self._convert(parse_qs(url.query), headers, reader, writer, keep_alive)
+        else:
+            raise HttpError(404, f"No such endpoint: {url.path}")
+
+    # --- /convert ---
+
+    async def _convert(self, query, headers, reader, writer, keep_alive):
+        codes = ",".join(query.get('options', ['A1'])).split(",")
+        try:
+            selected_options = [OPTION_CODES[code.strip().upper()] for code in codes if code.strip()]
+        except KeyError as e:
+            raise HttpError(400, f"Unknown option {e}. Choose from: {', '.join(OPTION_CODES)}")
+
+        name = os.path.basename(query.get('name', [headers.get('x-filename', '')])[0])
+        if not os.path.splitext(name)[-1]:
+            raise HttpError(400, "Pass the file name (with extension) as ?name= or X-Filename")
+        if any(ord(char) < 32 or ord(char) == 127 for char in name):
+            raise HttpError(400, "File name must not contain control characters")
+        separate_folders = query.get('separate', ['0'])[0] == '1'
+        want_zip = query.get('zip', ['0'])[0] == '1'
+
+        work_dir = tempfile.mkdtemp(prefix='mydocs-')
+        try:
+            # Holding a slot while reading the body is what throttles uploads
+            async with self._slots:
+                input_path = os.path.join(work_dir, name)
+                await self._receive_body(headers, reader, writer, input_path)
+
+                loop = asyncio.get_running_loop()
+                try:
+                    result_path, log_lines = await loop.run_in_executor(
+                        self._pool, convert_job, input_path, work_dir, selected_options, separate_folders, want_zip,
+                        self.pdf_max_pixels)
+                except Exception as e:
+                    raise HttpError(500, f"Conversion failed: {e}")
+
+            for line in log_lines:
+                self.log(line)
+            if result_path is None:
+                raise HttpError(422, "\n".join(log_lines) or "No output produced")
+
+            await self._send_file(writer, result_path, keep_alive)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    async def _receive_body(self, headers, reader, writer, dest_path):
+        """
+        Streams the request body to disk without holding more than one chunk in memory.
+        Runs once the upload holds a job slot, so clients sending 'Expect: 100-continue'
+        (curl does for larger files) are told to go ahead only now.
+        """
+        received = 0
+        with open(dest_path, 'wb') as f:
+            if 'chunked' in headers.get('transfer-encoding', '').lower():
+                await self._send_continue(headers, writer)
+                while True:
+                    size_line = await self._read(reader.readuntil(b"\r\n"))
+                    try:
+                        size = int(size_line.split(b";")[0].strip(), 16)
+                    except ValueError:
+                        raise HttpError(400, "Malformed chunk size")
+                    if size < 0:
+                        raise HttpError(400, "Malformed chunk size")
+                    if size == 0:
+                        # Skip trailers up to the final empty line
+                        while (await self._read(reader.readuntil(b"\r\n"))) != b"\r\n":
+                            pass
+                        break
+                    received += size
+                    if received > self.max_body:
+                        raise HttpError(413, "Upload too large")
+                    await self._copy_exactly(reader, f, size)
+                    await self._read(reader.readexactly(2)) # CRLF after each chunk
+            else:
+                if 'content-length' not in headers:
+                    raise HttpError(411, "Content-Length or chunked encoding required")
+                try:
+                    length = int(headers['content-length'])
+                except ValueError:
+                    raise HttpError(400, "Bad Content-Length")
+                if length < 0:
+                    raise HttpError(400, "Bad Content-Length")
+                if length > self.max_body:
+                    raise HttpError(413, "Upload too large")
+                await self._send_continue(headers, writer)
+                await self._copy_exactly(reader, f, length)
+
+    async def _send_continue(self, headers, writer):
+        if headers.get('expect', '').lower() == '100-continue':
+            writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+            await writer.drain()
+
+    async def _read(self, read_call):
+        """
+        Awaits one body read, giving up after 'idle_timeout' without data. The upload holds a
+        job slot, so a stalled client must not keep it forever.
+        """
+        try:
+            return await asyncio.wait_for(read_call, self.idle_timeout)
+        except asyncio.TimeoutError:
+            raise HttpError(408, "Upload stalled")
+
+    async def _copy_exactly(self, reader, f, length):
+        remaining = length
+        while remaining:
+            chunk = await self._read(reader.read(min(CHUNK_SIZE, remaining)))
+            if not chunk:
+                raise asyncio.IncompleteReadError(b"", remaining)
+            f.write(chunk)
+            remaining -= len(chunk)
+
+    # --- RESPONSES ---
+
+    def _head(self, status, headers, keep_alive):
+        lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+        lines += [f"{name}: {value}" for name, value in headers]
+        lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1')
+
+    async def _send_bytes(self, writer, status, body, content_type, keep_alive):
+        writer.write(self._head(status, [("Content-Type", content_type),
+                                         ("Content-Length", len(body))], keep_alive))
+        writer.write(body)
+        await writer.drain()
+
+    async def _send_error(self, writer, error, keep_alive):
+        body = (str(error) + "\n").encode('utf-8')
+        await self._send_bytes(writer, error.status, body, 'text/plain; charset=utf-8', keep_alive)
+
+    def _content_disposition(self, name):
+        """
+        Headers are latin-1, so the plain 'filename' gets an ASCII stand-in and the real
+        name goes into the RFC 5987 'filename*' parameter.
+        """
+        fallback = "".join(char if 32 <= ord(char) < 127 and char not in '"\\' else '_' for char in name)
+        return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(name, safe='')}"
+
+    async def _send_file(self, writer, path, keep_alive):
+        """Streams a result file; drain() after each chunk applies the client's backpressure."""
+        name = os.path.basename(path)
+        ext = os.path.splitext(name)[-1].lower().strip('.')
+        headers = [
+            ("Content-Type", CONTENT_TYPES.get(ext, 'application/octet-stream')),
+            ("Content-Length", os.path.getsize(path)),
+            ("Content-Disposition", self._content_disposition(name)),
+        ]
+        writer.write(self._head(200, headers, keep_alive))
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                writer.write(chunk)
+                await writer.drain()
+
+
+def serve(host="127.0.0.1", port=8765, max_jobs=None, workers=None, pdf_max_pixels=None, log=print):
+    """Runs the server until interrupted."""
+    server = ConversionServer(host, port, max_jobs=max_jobs, workers=workers,
+                              pdf_max_pixels=pdf_max_pixels, log=log)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        log("Server stopped.")
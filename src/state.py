@@ -0,0 +1,93 @@
+import os
+import json
+from .outputstore import file_digest
+
+STATE_FILE_NAME = '.mydocs_state.json'
+
+
+class ProcessedIndex:
+    """
+    Remembers which source files were already processed, and with which options,
+    so headless modes only touch new or changed files.
+
+    A file counts as unchanged if its size and mtime match the last run. If they
+    differ, the content hash decides (a copy or 'touch' with identical bytes is not
+    new work). Changing the option set always triggers reprocessing.
+    Stored as JSON next to the outputs: {path: {size, mtime_ns, digest, options, outputs}}.
+    """
+
+    def __init__(self, output_dir):
+        self.path = os.path.join(output_dir, STATE_FILE_NAME)
+        self.entries = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        """Writes the index atomically (temp file + rename), only if something changed."""
+        if not self._dirty:
+            return
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+    def needs_processing(self, file_path, options_key):
+        """Returns True if the file is new, its content changed, or the options changed."""
+        file_path = os.path.abspath(file_path)
+        entry = self.entries.get(file_path)
+        if entry is None or entry.get('options') != options_key:
+            return True
+
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return False # Vanished; nothing to do
+
+        if entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+            return False
+
+        # Size or mtime moved: only the hash can tell whether the content really changed
+        if entry['size'] == st.st_size and entry.get('digest') == file_digest(file_path):
+            entry['mtime_ns'] = st.st_mtime_ns
+            self._dirty = True
+            return False
+        return True
+
+    def previous_outputs(self, file_path):
+        """Returns the outputs recorded for a file on its last run."""
+        entry = self.entries.get(os.path.abspath(file_path))
+        return list(entry.get('outputs', [])) if entry else []
+
+    def mark_done(self, file_path, options_key, outputs):
+        """Records the current size/mtime/hash of a processed file."""
+        file_path = os.path.abspath(file_path)
+        try:
+            st = os.stat(file_path)
+            digest = file_digest(file_path)
+        except OSError:
+            return
+
+        self.entries[file_path] = {
+            'size': st.st_size,
+            'mtime_ns': st.st_mtime_ns,
+            'digest': digest,
+            'options': options_key,
+            'outputs': list(outputs),
+        }
+        self._dirty = True
+
+    def mark_failed(self, file_path, outputs):
+        """
+        Records a file whose run had failed ops. It stays due for processing, but its
+        partial outputs are remembered so the retry replaces them.
+        """
+        self.entries[os.path.abspath(file_path)] = {'outputs': list(outputs)}
+        self._dirty = True
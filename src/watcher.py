@@ -0,0 +1,286 @@
+import os
+import sys
+import time
+import select
+import struct
+import threading
+from .config import SUPPORTED_EXTS
+from .state import ProcessedIndex
+from .events import Message, FileFailed
+
+# --- inotify constants (see <sys/inotify.h>) ---
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o4000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO
+
+_EVENT_HEADER = struct.Struct('iIII') # wd, mask, cookie, name length
+
+
+def _signature(path):
+    """(size, mtime) of a file, or None if it is gone."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_size, st.st_mtime_ns)
+
+
+class InotifyBackend:
+    """Kernel change notifications (Linux). Blocks in select(), so idle CPU is zero."""
+
+    name = "inotify"
+
+    def __init__(self, folders):
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self._folders = {}
+        for folder in folders:
+            wd = libc.inotify_add_watch(self._fd, os.fsencode(folder), WATCH_MASK)
+            if wd < 0:
+                err = ctypes.get_errno()
+                os.close(self._fd)
+                raise OSError(err, f"Cannot watch {folder}")
+            self._folders[wd] = folder
+
+        # Self-pipe so stop() can interrupt a blocking select()
+        self._wake_r, self._wake_w = os.pipe()
+
+    def wait(self, timeout):
+        """
+        Waits up to 'timeout' seconds (None = forever) for events.
+        Returns the set of touched paths, or None if the kernel queue overflowed.
+        """
+        ready, _, _ = select.select([self._fd, self._wake_r], [], [], timeout)
+        if self._wake_r in ready:
+            os.read(self._wake_r, 512)
+        if self._fd not in ready:
+            return set()
+
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                return None # Events were lost; caller rescans
+            folder = self._folders.get(wd)
+            if folder and name:
+                changed.add(os.path.join(folder, os.fsdecode(name)))
+        return changed
+
+    def wake(self):
+        os.write(self._wake_w, b'x')
+
+    def close(self):
+        for fd in (self._fd, self._wake_r, self._wake_w):
+            os.close(fd)
+
+
+class PollingBackend:
+    """Portable fallback: compares (size, mtime) snapshots every 'interval' seconds."""
+
+    name = "polling"
+
+    def __init__(self, folders, interval):
+        self.folders = folders
+        self.interval = interval
+        self._stop = threading.Event()
+        self._snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for folder in self.folders:
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        if entry.is_file():
+                            st = entry.stat()
+                            snapshot[entry.path] = (st.st_size, st.st_mtime_ns)
+            except OSError:
+                continue
+        return snapshot
+
+    def wait(self, timeout):
+        delay = self.interval if timeout is None else min(timeout, self.interval)
+        if self._stop.wait(delay):
+            return set()
+
+        snapshot = self._scan()
+        changed = {path for path, sig in snapshot.items() if self._snapshot.get(path) != sig}
+        self._snapshot = snapshot
+        return changed
+
+    def wake(self):
+        self._stop.set()
+
+    def close(self):
+        pass
+
+
+class FolderWatcher:
+    """
+    Long-running 'drop files in, get converted files out' mode.
+
+    Watches one or more folders (not recursive) and runs the selected options on
+    every new or changed file once it has stopped growing for 'settle' seconds.
+    What was already done is kept in a ProcessedIndex next to the outputs, so a
+    restart only picks up files that are new, changed, or need the new option set.
+    """
+
+    def __init__(self, processor, folders, selected_options, separate_folders,
+                 settle=2.0, poll_interval=2.0, use_inotify=True):
+        self.processor = processor
+        self.folders = [os.path.abspath(folder) for folder in folders]
+        self.separate_folders = separate_folders
+        self.settle = settle
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+
+        self.methods = processor.methods_for(selected_options)
+        self.options_key = processor.options_key(selected_options, separate_folders)
+        self.index = ProcessedIndex(processor.OUTPUT_BASE_DIR)
+
+        self._pending = {} # path -> (signature, deadline) while waiting for writes to settle
+        self._stop = threading.Event()
+        self.backend = None
+
+    def log(self, template, *args, level='info'):
+        self.processor.emit(Message(template, args, level))
+
+    def _make_backend(self):
+        if self.use_inotify and sys.platform.startswith('linux'):
+            try:
+                return InotifyBackend(self.folders)
+            except (OSError, AttributeError) as e:
+                self.log("inotify unavailable ({}), falling back to polling.", e, level='warning')
+        return PollingBackend(self.folders, self.poll_interval)
+
+    # --- DEBOUNCING ---
+
+    def _is_candidate(self, path):
+        name = os.path.basename(path)
+        # Hidden files and editor/download temp files ('~$doc', '.part') are never inputs
+        if name.startswith(('.', '~')):
+            return False
+        if os.path.splitext(name)[-1].lower().strip('.') not in SUPPORTED_EXTS:
+            return False
+        # Never feed our own outputs back in
+        output_root = self.processor.OUTPUT_BASE_DIR
+        return not os.path.abspath(path).startswith(output_root + os.sep)
+
+    def _schedule(self, path):
+        """(Re)starts the settle timer for a path."""
+        signature = _signature(path)
+        if signature is None:
+            self._pending.pop(path, None)
+        else:
+            self._pending[path] = (signature, time.monotonic() + self.settle)
+
+    def _take_settled(self):
+        """Returns pending files whose size and mtime did not change during the settle time."""
+        now = time.monotonic()
+        ready = []
+        for path, (signature, deadline) in list(self._pending.items()):
+            if deadline > now:
+                continue
+            current = _signature(path)
+            if current is None:
+                del self._pending[path]
+            elif current != signature:
+                self._pending[path] = (current, now + self.settle) # Still being written
+            else:
+                del self._pending[path]
+                ready.append(path)
+        return ready
+
+    def _next_timeout(self):
+        """Seconds until the next settle deadline; None (sleep until an event) when idle."""
+        if not self._pending:
+            return None
+        return max(0.0, min(deadline for _, deadline in self._pending.values()) - time.monotonic())
+
+    def scan_all(self):
+        """Queues every candidate file currently in the watched folders."""
+        for folder in self.folders:
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        if entry.is_file() and self._is_candidate(entry.path):
+                            self._schedule(entry.path)
+            except OSError as e:
+                self.log("Cannot read folder {}: {}", folder, e, level='error')
+
+    # --- MAIN LOOP ---
+
+    def run(self):
+        """Blocks until stop() is called."""
+        self.backend = self._make_backend()
+        self.log("Watching {} folder(s) using {}: {}", len(self.folders), self.backend.name, ', '.join(self.folders))
+        self.scan_all()
+
+        try:
+            while not self._stop.is_set():
+                changed = self.backend.wait(self._next_timeout())
+                if changed is None:
+                    self.scan_all()
+                else:
+                    for path in changed:
+                        if self._is_candidate(path):
+                            self._schedule(path)
+
+                ready = self._take_settled()
+                if ready:
+                    self._process(ready)
+        finally:
+            self.backend.close()
+            self.index.save()
+
+    def stop(self):
+        self._stop.set()
+        if self.backend is not None:
+            self.backend.wake()
+
+    def _process(self, paths):
+        for path in sorted(paths):
+            if not self.index.needs_processing(path, self.options_key):
+                continue
+
+            # Outputs of the previous version would otherwise be skipped as 'already exists'
+            for old_output in self.index.previous_outputs(path):
+                try:
+                    os.remove(old_output)
+                except OSError:
+                    pass
+
+            try:
+                outputs, ok = self.processor.process_single_file(path, self.methods, self.separate_folders)
+            except Exception as e:
+                self.processor.emit(FileFailed(path, f"Processing failed: {e}"))
+                continue
+            if ok:
+                self.index.mark_done(path, self.options_key, outputs)
+            else:
+                self.index.mark_failed(path, outputs) # Retried once the file changes or the watcher restarts
+
+        self.index.save()
+        # The service runs for weeks: keep the in-memory caches bounded
+        self.processor.output_store.prune()
+        self.processor.analysis_cache.prune()
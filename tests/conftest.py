@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+from PIL import Image
+
+# The app runs from the repository root (main.py), so 'src' is imported from there
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def make_image(tmp_path):
+    """Writes a solid-color test image and returns its path."""
+    def make(name, color="red", size=(32, 32), folder=None, **save_params):
+        folder = folder or tmp_path / "in"
+        folder.mkdir(parents=True, exist_ok=True)
+        path = folder / name
+        Image.new("RGB", size, color).save(path, **save_params)
+        return str(path)
+    return make
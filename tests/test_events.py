@@ -0,0 +1,58 @@
+from src.events import (CollectorSink, FileFinished, FileStarted, OpFinished, OpResult, OutputWritten,
+                        describe)
+from src.fileprocessor import FileProcessor
+
+PNG = "A3: Convert Image/PDF to PNG"
+COMPRESS_250 = "B2: Compress to < 250 KB"
+
+
+def test_combine_status():
+    ok = OpResult('ok', 'page_converted', (1, 'PNG'))
+    skipped = OpResult('skipped', 'page_exists', (2,))
+    failed = OpResult('failed', 'page_failed', (3, 'boom'))
+
+    assert OpResult.combine([ok, skipped]).status == 'ok'
+    assert OpResult.combine([skipped]).status == 'skipped'
+    assert OpResult.combine([ok, failed]).status == 'failed'
+
+
+def test_describe():
+    assert describe(OpResult('ok', 'converted', ('PNG', 'out/x.png'))) == "Converted to PNG at out/x.png"
+    parts = [OpResult('ok', 'page_converted', (1, 'PNG')), OpResult('skipped', 'page_exists', (2,))]
+    assert describe(OpResult.combine(parts, 'pdf_pages', ('PNG',))) == (
+        "PDF to PNG finished. Details: Page 1 converted to PNG., Page 2 skipped (exists).")
+
+
+def test_process_single_file_emits_events(tmp_path, make_image):
+    sink = CollectorSink()
+    processor = FileProcessor(output_dir=tmp_path / "out", sinks=[sink])
+    processor.copy_originals = False
+    source = make_image("scan.png")
+
+    outputs, ok = processor.process_single_file(source, processor.methods_for([PNG, COMPRESS_250]), False)
+
+    assert ok
+    assert [type(event) for event in sink.events] == [FileStarted, OutputWritten, OpFinished, OpFinished,
+                                                      FileFinished]
+    convert, compress = sink.of_type(OpFinished)
+    assert (convert.op, convert.status) == ('A3', 'ok')
+    assert [part.reason for part in convert.result.parts] == ['converted']
+    assert convert.bytes_written == sink.of_type(OutputWritten)[0].nbytes
+    # B options only compress JPEG sources; that is a skip, not a failure
+    assert (compress.op, compress.status, compress.result.reason) == ('B2', 'skipped', 'under_target')
+    assert sink.of_type(FileFinished)[0].outputs == outputs == [str(tmp_path / "out" / "scan.png")]
+
+
+def test_failed_op_is_reported(tmp_path):
+    sink = CollectorSink()
+    processor = FileProcessor(output_dir=tmp_path / "out", sinks=[sink])
+    processor.copy_originals = False
+    broken = tmp_path / "broken.jpg"
+    broken.write_bytes(b"not a jpeg")
+
+    outputs, ok = processor.process_single_file(str(broken), processor.methods_for([PNG]), False)
+
+    assert not ok and outputs == []
+    (op,) = sink.of_type(OpFinished)
+    assert op.status == 'failed'
+    assert [part.reason for part in op.result.parts] == ['convert_failed']
@@ -0,0 +1,108 @@
+import os
+
+from PIL import Image
+
+from src.events import CollectorSink, FileSkipped
+from src.fileprocessor import FileProcessor
+from src.outputstore import OutputStore
+
+PNG = "A3: Convert Image/PDF to PNG"
+
+
+def _pixel(path):
+    with Image.open(path) as img:
+        return img.convert("RGB").getpixel((0, 0))
+
+
+def test_identical_outputs_are_hardlinked(tmp_path):
+    store = OutputStore()
+    first, second = tmp_path / "a.bin", tmp_path / "b.bin"
+    first.write_bytes(b"same bytes")
+    second.write_bytes(b"same bytes")
+
+    assert not store.register(str(first))
+    assert store.register(str(second))
+    assert os.path.samefile(first, second)
+    assert store.linked_files == 1
+
+
+def test_rewritten_output_is_not_linked_to(tmp_path):
+    store = OutputStore()
+    first, second = tmp_path / "a.bin", tmp_path / "b.bin"
+    first.write_bytes(b"old bytes")
+    store.register(str(first))
+    first.write_bytes(b"new bytes!") # Rewritten after it was registered
+    second.write_bytes(b"old bytes")
+
+    assert not store.register(str(second))
+    assert first.read_bytes() == b"new bytes!"
+
+
+def test_claim_input_offers_finished_outputs(tmp_path):
+    store = OutputStore()
+    original, copy, output = tmp_path / "scan.jpg", tmp_path / "scan (1).jpg", tmp_path / "scan.png"
+    original.write_bytes(b"input")
+    copy.write_bytes(b"input")
+    output.write_bytes(b"output")
+
+    key, duplicate = store.claim_input(str(original), 'A3')
+    assert duplicate is None
+    store.finish_input(key, str(original), [str(output)])
+
+    assert store.claim_input(str(copy), 'A3') == (key, (str(original), [str(output)]))
+    # Other options give other outputs, so nothing is shared
+    assert store.claim_input(str(copy), 'A4')[1] is None
+
+
+def test_claim_input_forgets_rewritten_outputs(tmp_path):
+    store = OutputStore()
+    original, copy, output = tmp_path / "scan.jpg", tmp_path / "scan (1).jpg", tmp_path / "scan.png"
+    original.write_bytes(b"input")
+    copy.write_bytes(b"input")
+    output.write_bytes(b"output")
+    key, _ = store.claim_input(str(original))
+    store.finish_input(key, str(original), [str(output)])
+
+    output.write_bytes(b"another file's output")
+    assert store.claim_input(str(copy)) == (key, None)
+
+
+def test_incomplete_input_is_not_offered(tmp_path):
+    store = OutputStore()
+    original, copy, output = tmp_path / "scan.jpg", tmp_path / "scan (1).jpg", tmp_path / "scan.png"
+    original.write_bytes(b"input")
+    copy.write_bytes(b"input")
+    output.write_bytes(b"output")
+    key, _ = store.claim_input(str(original))
+    store.finish_input(key, str(original), [str(output)], complete=False)
+
+    assert store.claim_input(str(copy))[1] is None
+
+
+def test_duplicate_reuses_outputs(tmp_path, make_image):
+    sink = CollectorSink()
+    processor = FileProcessor(output_dir=tmp_path / "out", sinks=[sink])
+    processor.copy_originals = False
+    make_image("scan.jpg", "red")
+    make_image("scan (1).jpg", "red")
+
+    processor.run_folder(tmp_path / "in", [PNG], False, workers=1)
+
+    (skipped,) = sink.of_type(FileSkipped)
+    assert skipped.reason == "duplicate" and skipped.reused == 1
+    assert os.path.samefile(tmp_path / "out" / "scan.png", tmp_path / "out" / "scan (1).png")
+
+
+def test_duplicate_of_regenerated_output_is_encoded_again(tmp_path, make_image):
+    processor = FileProcessor(output_dir=tmp_path / "out", sinks=[CollectorSink()])
+    processor.copy_originals = False
+    make_image("x.jpg", "red")
+    processor.run_folder(tmp_path / "in", [PNG], False, workers=1)
+    # x.png is regenerated from new content; red inputs must no longer map to it
+    make_image("x.jpg", "blue")
+    processor.run_folder(tmp_path / "in", [PNG], False, workers=1)
+    make_image("y.jpg", "red")
+    processor.run_folder(tmp_path / "in", [PNG], False, workers=1)
+
+    assert _pixel(tmp_path / "out" / "x.png")[2] > 200 # Blue
+    assert _pixel(tmp_path / "out" / "y.png")[0] > 200 # Red
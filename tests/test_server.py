@@ -0,0 +1,92 @@
+import asyncio
+import io
+
+from PIL import Image
+
+from src.server import ConversionServer
+
+
+def _png_bytes():
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 32), "red").save(buffer, "png")
+    return buffer.getvalue()
+
+
+async def _request(port, head, body=b""):
+    """Sends one request with 'Connection: close' and returns (status line, headers, body)."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(head.encode("latin-1") + b"Connection: close\r\n\r\n" + body)
+    await writer.drain()
+    response = await asyncio.wait_for(reader.read(), 30)
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    status, *lines = head.decode("latin-1").split("\r\n")
+    headers = dict(line.split(": ", 1) for line in lines)
+    return status, headers, body
+
+
+def _run_with_server(scenario):
+    async def main():
+        server = ConversionServer(port=0, workers=1, idle_timeout=5, log=lambda message: None)
+        await server.start()
+        try:
+            return await scenario(server.port)
+        finally:
+            await server.close()
+    return asyncio.run(main())
+
+
+def test_convert_round_trip():
+    data = _png_bytes()
+
+    async def scenario(port):
+        health = await _request(port, "GET /health HTTP/1.1\r\n")
+        converted = await _request(port, "POST /convert?options=A4&name=scan.png HTTP/1.1\r\n"
+                                         f"Content-Length: {len(data)}\r\n", data)
+        return health, converted
+
+    health, (status, headers, body) = _run_with_server(scenario)
+
+    assert health[0] == "HTTP/1.1 200 OK" and health[2] == b"ok"
+    assert status == "HTTP/1.1 200 OK"
+    assert headers["Content-Type"] == "image/jpeg"
+    assert int(headers["Content-Length"]) == len(body)
+    assert Image.open(io.BytesIO(body)).format == "JPEG"
+
+
+def test_bad_uploads_are_rejected():
+    data = _png_bytes()
+
+    async def scenario(port):
+        negative = await _request(port, "POST /convert?name=scan.png HTTP/1.1\r\nContent-Length: -1\r\n", data)
+        injected = await _request(port, "POST /convert?name=a%0d%0aX-Evil:%201.png HTTP/1.1\r\n"
+                                        f"Content-Length: {len(data)}\r\n", data)
+        unknown = await _request(port, "POST /convert?options=Z9&name=scan.png HTTP/1.1\r\n"
+                                       f"Content-Length: {len(data)}\r\n", data)
+        return negative, injected, unknown
+
+    for status, headers, _ in _run_with_server(scenario):
+        assert status == "HTTP/1.1 400 Bad Request"
+        assert "X-Evil" not in headers
+
+
+def test_unicode_name_and_100_continue():
+    data = _png_bytes()
+
+    async def scenario(port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(("POST /convert?options=A4&name=%E6%96%87.png HTTP/1.1\r\nExpect: 100-continue\r\n"
+                      f"Connection: close\r\nContent-Length: {len(data)}\r\n\r\n").encode("latin-1"))
+        await writer.drain()
+        interim = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 30)
+        writer.write(data)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), 30)
+        writer.close()
+        return interim, response
+
+    interim, response = _run_with_server(scenario)
+
+    assert interim == b"HTTP/1.1 100 Continue\r\n\r\n"
+    assert response.startswith(b"HTTP/1.1 200 OK")
+    assert b"filename*=UTF-8''%E6%96%87.jpeg" in response
@@ -0,0 +1,60 @@
+import os
+
+from src.events import CollectorSink, FileSkipped
+from src.fileprocessor import FileProcessor
+from src.state import ProcessedIndex
+
+PNG = "A3: Convert Image/PDF to PNG"
+
+
+def test_unchanged_file_is_skipped(tmp_path, make_image):
+    index = ProcessedIndex(tmp_path)
+    source = make_image("scan.jpg")
+    assert index.needs_processing(source, PNG)
+
+    index.mark_done(source, PNG, [])
+    index.save()
+    assert not ProcessedIndex(tmp_path).needs_processing(source, PNG)
+
+
+def test_touch_without_new_bytes_is_skipped(tmp_path, make_image):
+    index = ProcessedIndex(tmp_path)
+    source = make_image("scan.jpg")
+    index.mark_done(source, PNG, [])
+
+    st = os.stat(source)
+    os.utime(source, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    assert not index.needs_processing(source, PNG)
+
+
+def test_changed_content_or_options_reprocess(tmp_path, make_image):
+    index = ProcessedIndex(tmp_path)
+    source = make_image("scan.jpg", "red")
+    index.mark_done(source, PNG, [])
+
+    assert index.needs_processing(source, PNG + "|separate")
+    make_image("scan.jpg", "blue", size=(48, 48))
+    assert index.needs_processing(source, PNG)
+
+
+def test_failed_file_stays_due(tmp_path, make_image):
+    index = ProcessedIndex(tmp_path)
+    source = make_image("scan.jpg")
+    index.mark_failed(source, ["/out/scan.png"])
+
+    assert index.needs_processing(source, PNG)
+    assert index.previous_outputs(source) == ["/out/scan.png"]
+
+
+def test_run_folder_skips_done_and_retries_failed(tmp_path, make_image):
+    make_image("good.jpg")
+    (tmp_path / "in" / "bad.jpg").write_bytes(b"not a jpeg")
+
+    def run():
+        sink = CollectorSink()
+        processor = FileProcessor(output_dir=tmp_path / "out", sinks=[sink])
+        processed = processor.run_folder(tmp_path / "in", [PNG], False, workers=2)
+        return processed, [os.path.basename(event.path) for event in sink.of_type(FileSkipped)]
+
+    assert run() == (2, [])
+    assert run() == (1, ["good.jpg"])